@@ -1,11 +1,12 @@
 # "main.py"
 
 import sys
-from src.ui.main_window import MainWindow
 from PyQt5.QtWidgets import QApplication
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    # Imported once the application exists; pulls in the GA, simulations and matplotlib
+    from src.ui.main_window import MainWindow
     main_window = MainWindow()
     main_window.show()
     sys.exit(app.exec_())
\ No newline at end of file
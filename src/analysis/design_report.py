@@ -6,18 +6,60 @@
 ## 3. Plot a radar chart of the building design performance
 ## 4. Save report as an Excel file
 
-import pandas as pd
-from ..simulation_engine.structural_integrity import StructuralIntegrity
-from ..simulation_engine.energy_simulation import EnergySimulation
-from ..simulation_engine.safety_assessment import SafetyAssessment
-from ..simulation_engine.livability_evaluation import LivabilityEvaluation
-from ..simulation_engine.cost_estimation import CostEstimation
-from ..simulation_engine.pedestrian_flow import PedestrianFlowSimulation
-from ..simulation_engine.blast_resistance_simulation import BlastResistanceSimulation
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from ..genetic_algorithm.encoding import GENOME_DTYPE
+
+# pandas, xlsxwriter and the simulation engines (scipy) are imported where they are
+# first used, so importing this module stays cheap for callers that never build a report
+
+def _child_value_getter(section, index):
+    def getter(genome):
+        return genome.genes[section].children[index].value
+    return getter
 
 class DesignReport:
+    # The radar axes never change, so their angles are computed once for every report
+    _RADAR_CATEGORIES = ('Structural', 'Energy', 'Safety', 'Livability', 'Cost', 'Evacuation', 'Blast Resistance')
+    _ANGLES = np.linspace(0, 2 * np.pi, len(_RADAR_CATEGORIES), endpoint=False)
+    _ANGLES_CLOSED = np.concatenate([_ANGLES, _ANGLES[:1]])
+
+    # Characteristics table label -> (top-level gene, field)
+    _CHARACTERISTICS = (
+        ("Height", 'building_envelope', 'height'),
+        ("Width", 'building_envelope', 'width'),
+        ("Length", 'building_envelope', 'length'),
+        ("Shape", 'building_envelope', 'shape'),
+        ("Material", 'structural_system', 'material'),
+        ("Frame Type", 'structural_system', 'frame_type'),
+        ("Number of Floors", 'floor_plans', 'num_floors'),
+        ("Floor Height", 'floor_plans', 'floor_height'),
+        ("HVAC Type", 'mep_systems', 'hvac_type'),
+        ("Renewable Energy", 'mep_systems', 'renewable_energy'),
+        ("Window Ratio", 'facade', 'window_ratio'),
+    )
+
+    # Resolved once from the schema, so each characteristic is a single closure call
+    _GETTERS = {label: _child_value_getter(section, GENOME_DTYPE[section].names.index(field))
+                for label, section, field in _CHARACTERISTICS}
+
     def __init__(self, genome):
         self.genome = genome
+        self._create_simulations()
+
+    def _create_simulations(self):
+        # Several simulations read their genome values once on construction, so they are
+        # rebuilt whenever the genome may have changed
+        from ..simulation_engine.structural_integrity import StructuralIntegrity
+        from ..simulation_engine.energy_simulation import EnergySimulation
+        from ..simulation_engine.safety_assessment import SafetyAssessment
+        from ..simulation_engine.livability_evaluation import LivabilityEvaluation
+        from ..simulation_engine.cost_estimation import CostEstimation
+        from ..simulation_engine.pedestrian_flow import PedestrianFlowSimulation
+        from ..simulation_engine.blast_resistance_simulation import BlastResistanceSimulation
+
+        genome = self.genome
         self.structural_integrity = StructuralIntegrity(genome)
         self.energy_simulation = EnergySimulation(genome)
         self.safety_assessment = SafetyAssessment(genome)
@@ -25,37 +67,66 @@ class DesignReport:
         self.cost_estimation = CostEstimation(genome)
         self.pedestrian_flow = PedestrianFlowSimulation(genome)
         self.blast_resistance = BlastResistanceSimulation(genome)
+        self._report_cache = None
 
     def generate_report(self):
-        report = {
-            "Building Characteristics": self.get_building_characteristics(),
-            "Structural Integrity": self.structural_integrity.analyse(),
-            "Energy Efficiency": self.energy_simulation.simulate(),
-            "Safety Assessment": self.safety_assessment.assess(),
-            "Livability Evaluation": self.livability_evaluation.evaluate(),
-            "Cost Estimation": self.cost_estimation.estimate(),
-            "Pedestrian Flow": self.pedestrian_flow.simulate(),
-            "Blast Resistance": self.blast_resistance.simulate()
+        # The simulations are expensive, so the report is built once and shared
+        # by the radar chart and the Excel export until invalidate() is called
+        if self._report_cache is None:
+            self._report_cache = self._build_report()
+        return self._report_cache
+
+    def invalidate(self):
+        # Call after mutating the genome so the next report re-runs the simulations
+        self._create_simulations()
+
+    def _build_report(self):
+        # The simulations share no state, so they run concurrently; the pedestrian
+        # flow simulation dominates and releases the GIL inside its array ops
+        tasks = {
+            "Structural Integrity": self.structural_integrity.analyse,
+            "Energy Efficiency": self.energy_simulation.simulate,
+            "Safety Assessment": self.safety_assessment.assess,
+            "Livability Evaluation": self.livability_evaluation.evaluate,
+            "Cost Estimation": self.cost_estimation.estimate,
+            "Pedestrian Flow": self.pedestrian_flow.simulate,
+            "Blast Resistance": self.blast_resistance.simulate
         }
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = {section: executor.submit(task) for section, task in tasks.items()}
+            report = {"Building Characteristics": self.get_building_characteristics()}
+            report.update((section, future.result()) for section, future in futures.items())
         return report
 
     def get_building_characteristics(self):
-        return {
-            "Height": self.genome.genes['building_envelope'].children[0].value,
-            "Width": self.genome.genes['building_envelope'].children[1].value,
-            "Length": self.genome.genes['building_envelope'].children[2].value,
-            "Shape": self.genome.genes['building_envelope'].children[3].value,
-            "Material": self.genome.genes['structural_system'].children[0].value,
-            "Frame Type": self.genome.genes['structural_system'].children[1].value,
-            "Number of Floors": self.genome.genes['floor_plans'].children[0].value,
-            "Floor Height": self.genome.genes['floor_plans'].children[1].value,
-            "HVAC Type": self.genome.genes['mep_systems'].children[0].value,
-            "Renewable Energy": self.genome.genes['mep_systems'].children[3].value,
-            "Window Ratio": self.genome.genes['facade'].children[0].value,
-        }
+        return {label: getter(self.genome) for label, getter in self._GETTERS.items()}
+
+    @classmethod
+    def building_characteristics(cls, records):
+        # Reads each characteristic as one column of GENOME_DTYPE records; a single
+        # record gives one dict, a 1-D record array gives one dict per individual
+        records = np.asarray(records)
+        columns = {label: records[section][field].tolist() for label, section, field in cls._CHARACTERISTICS}
+        if records.ndim == 0:
+            return columns
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
 
     def generate_summary_table(self, report):
-        summary = {
+        import pandas as pd
+        return pd.DataFrame([self._summary_row(report)])
+
+    def generate_detailed_table(self, report):
+        import pandas as pd
+        return pd.DataFrame(self.detailed_rows(report), columns=['Section', 'Metric', 'Value'])
+
+    def detailed_rows(self, report):
+        # Flattens the nested section dicts into scalar (section, metric, value) rows
+        for section, metrics in report.items():
+            for metric, value in metrics.items():
+                yield section, metric, self._cell_value(value)
+
+    def _summary_row(self, report):
+        return {
             "Structural Integrity": report["Structural Integrity"]["overall_integrity"],
             "Energy Efficiency": report["Energy Efficiency"]["energy_efficiency"],
             "Safety Score": report["Safety Assessment"]["overall_safety"],
@@ -64,56 +135,59 @@ class DesignReport:
             "Evacuation Efficiency": report["Pedestrian Flow"]["evacuation_efficiency"],
             "Blast Resistance Score": report["Blast Resistance"]["blast_resistance_score"]
         }
-        return pd.DataFrame([summary])
 
     def plot_performance_radar(self, ax):
-        categories = ['Structural', 'Energy', 'Safety', 'Livability', 'Cost', 'Evacuation', 'Blast Resistance']
-        report = self.generate_report()
-        values = [
-            report["Structural Integrity"]["overall_integrity"],
-            report["Energy Efficiency"]["energy_efficiency"],
-            report["Safety Assessment"]["overall_safety"],
-            report["Livability Evaluation"]["livability_score"],
-            report["Cost Estimation"]["cost_score"],
-            report["Pedestrian Flow"]["evacuation_efficiency"],
-            report["Blast Resistance"]["blast_resistance_score"]     
-        ]
-
-        angles = [n / float(len(categories)) * 2 * 3.141593 for n in range(len(categories))]
-        values += values[:1]
-        angles += angles[:1]
-
-        ax.plot(angles, values)
-        ax.fill(angles, values, alpha=0.3)
-        ax.set_xticks(angles[:-1])
-        ax.set_xticklabels(categories)
+        # _summary_row lists the metrics in the same order as _RADAR_CATEGORIES
+        values = np.fromiter(self._summary_row(self.generate_report()).values(), dtype=float)
+        values = np.concatenate([values, values[:1]])
+
+        ax.plot(self._ANGLES_CLOSED, values)
+        ax.fill(self._ANGLES_CLOSED, values, alpha=0.3)
+        ax.set_xticks(self._ANGLES)
+        ax.set_xticklabels(self._RADAR_CATEGORIES)
         ax.set_ylim(0, 1)
         ax.set_title("Building Performance Radar Chart")
 
     def save_report(self, output_path):
+        import xlsxwriter
+
         report = self.generate_report()
-        summary_table = self.generate_summary_table(report)
-
-        with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
-            # Write summary table
-            summary_table.to_excel(writer, sheet_name='Summary', index=False)
-
-            # Write detailed report
-            pd.DataFrame([report]).to_excel(writer, sheet_name='Detailed Report', index=False)
-
-            # Add performance radar chart
-            workbook = writer.book
-            worksheet = writer.sheets['Summary']
-            chart = workbook.add_chart({'type': 'radar'})
-            chart.add_series({
-                'categories': ['Summary', 0, 0, 0, 6],
-                'values': ['Summary', 1, 0, 1, 6],
-            })
-            chart.set_title({'name': 'Building Performance Radar Chart'})
-            worksheet.insert_chart('D2', chart)
+        summary = self._summary_row(report)
+
+        # Write rows straight through xlsxwriter rather than via pandas, which
+        # would serialise the nested section dicts cell by cell. constant_memory flushes
+        # each row to disk once the next one starts, so every sheet is written top to bottom.
+        workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True})
+
+        # Write summary table
+        summary_sheet = workbook.add_worksheet('Summary')
+        summary_sheet.write_row(0, 0, list(summary.keys()))
+        summary_sheet.write_row(1, 0, [self._cell_value(value) for value in summary.values()])
+
+        # Write detailed report as one (section, metric, value) row per entry
+        detail_sheet = workbook.add_worksheet('Detailed Report')
+        detail_sheet.write_row(0, 0, ['Section', 'Metric', 'Value'])
+        for row, values in enumerate(self.detailed_rows(report), start=1):
+            detail_sheet.write_row(row, 0, values)
+
+        # Add performance radar chart
+        chart = workbook.add_chart({'type': 'radar'})
+        chart.add_series({
+            'categories': ['Summary', 0, 0, 0, 6],
+            'values': ['Summary', 1, 0, 1, 6],
+        })
+        chart.set_title({'name': 'Building Performance Radar Chart'})
+        summary_sheet.insert_chart('D2', chart)
+
+        workbook.close()
 
         print(f"Report saved to {output_path}")
 
+    @staticmethod
+    def _cell_value(value):
+        # Unwrap NumPy scalars so xlsxwriter sees plain numbers, strings and bools
+        return value.item() if hasattr(value, 'item') else value
+
 # Example use case
 if __name__ == "__main__":
     from ..genetic_algorithm.encoding import BuildingGenome
@@ -11,8 +11,14 @@
 ## sources:
 ## https://ifcopenshell.org/docs/
 
+import functools
+import multiprocessing
+from collections import Counter
+
 import ifcopenshell
 import ifcopenshell.geom
+import ifcopenshell.util.element
+import ifcopenshell.util.shape
 import numpy as np
 from ..genetic_algorithm.encoding import BuildingGenome
 
@@ -20,28 +26,40 @@ class IFCInterface:
     def __init__(self):
         self.settings = ifcopenshell.geom.settings()
         self.settings.set(self.settings.USE_WORLD_COORDS, True)
+        self._shape_cache = {}
+        # GlobalId -> product for the file being processed, and a per-instance LRU of
+        # tessellated shapes by GlobalId so no element is sent through OCCT twice
+        self._lookup = {}
+        self._shape = functools.lru_cache(maxsize=4096)(self._create_shape)
 
     def import_from_ifc(self, file_path):
         # 1. Load IFC file and extract building entity
         ifc_file = ifcopenshell.open(file_path)
         building = ifc_file.by_type("IfcBuilding")[0]
 
-        # 2. Calculate building dimensions
-        bbox = self.calculate_bounding_box(building)
-        width = bbox[1][0] - bbox[0][0]
-        length = bbox[1][1] - bbox[0][1]
-        height = bbox[1][2] - bbox[0][2]
-
-        # 3. Extract information (basic building properties, materials, windows, MEP, structural, ...)
-        storeys = ifc_file.by_type("IfcBuildingStorey")
-        num_floors = len(storeys)
-        materials = self.get_building_materials(ifc_file)
-        primary_material = max(materials, key=materials.count) if materials else "concrete"
-        window_ratio = self.calculate_window_ratio(ifc_file)
-        hvac_type = self.get_hvac_type(ifc_file)
-        has_renewable_energy = self.check_renewable_energy(ifc_file)
-        frame_type = self.get_frame_type(ifc_file)
-        shape = self.determine_building_shape(bbox)
+        # Tessellate every product once; the extractors below read from the shape cache
+        self._reset_shapes()
+        self._index_products(ifc_file)
+        self._iter_shapes(ifc_file, ifc_file.by_type("IfcProduct"))
+        try:
+            # 2. Calculate building dimensions
+            bbox = self.calculate_bounding_box(building)
+            width = bbox[1][0] - bbox[0][0]
+            length = bbox[1][1] - bbox[0][1]
+            height = bbox[1][2] - bbox[0][2]
+
+            # 3. Extract information (basic building properties, materials, windows, MEP, structural, ...)
+            storeys = ifc_file.by_type("IfcBuildingStorey")
+            num_floors = len(storeys)
+            materials = self.get_building_materials(ifc_file)
+            primary_material = Counter(materials).most_common(1)[0][0] if materials else "concrete"
+            window_ratio = self.calculate_window_ratio(ifc_file)
+            hvac_type = self.get_hvac_type(ifc_file)
+            has_renewable_energy = self.check_renewable_energy(ifc_file)
+            frame_type = self.get_frame_type(ifc_file)
+            shape = self.determine_building_shape(bbox)
+        finally:
+            self._reset_shapes()
  
         # 4. Create, populate and return genome
         genome = BuildingGenome()
@@ -60,6 +78,7 @@ class IFCInterface:
 
     def export_to_ifc(self, genome, file_path):
         ifc_file = ifcopenshell.file()
+        self._reset_shapes()
 
         # 1. Create IFC entities
         project = ifc_file.createIfcProject("Project")
@@ -105,19 +124,67 @@ class IFCInterface:
         bbox_min = np.array([float('inf'), float('inf'), float('inf')])
         bbox_max = np.array([float('-inf'), float('-inf'), float('-inf')])
 
+        shape = None
         if product.is_a("IfcProduct"):
+            self._lookup.setdefault(product.GlobalId, product)
             try:
-                shape = ifcopenshell.geom.create_shape(self.settings, product)
-                verts = shape.verts
-                for i in range(0, len(verts), 3):
-                    point = np.array(verts[i:i+3])
-                    bbox_min = np.minimum(bbox_min, point)
-                    bbox_max = np.maximum(bbox_max, point)
+                shape = self._shape(product.GlobalId)
             except RuntimeError:
                 pass
 
+        if shape is not None:
+            verts = self.get_vertices(shape)
+        else:
+            # The product has no geometry of its own (e.g. IfcBuilding), so bound the already tessellated
+            # elements it contains, through its storeys and IfcRelContainedInSpatialStructure
+            contained = [self._shape_cache[element.GlobalId] for element in ifcopenshell.util.element.get_decomposition(product)
+                         if element.GlobalId in self._shape_cache]
+            verts = np.concatenate([self.get_vertices(s) for s in contained]) if contained else np.empty((0, 3))
+
+        if len(verts):
+            bbox_min = verts.min(axis=0)
+            bbox_max = verts.max(axis=0)
+
         return (bbox_min, bbox_max)
 
+    def _iter_shapes(self, ifc_file, products):
+        # Tessellates any products not already cached in one multi-threaded
+        # geometry pass and returns the cache, keyed by GlobalId
+        missing = [p for p in products if p.GlobalId not in self._shape_cache]
+        if missing:
+            iterator = ifcopenshell.geom.iterator(self.settings, ifc_file, multiprocessing.cpu_count(), include=missing)
+            if iterator.initialize():
+                while True:
+                    shape = iterator.get()
+                    self._shape_cache[shape.guid] = shape
+                    if not iterator.next():
+                        break
+        return self._shape_cache
+
+    def _create_shape(self, gid):
+        # Backs the _shape LRU: reuse the iterator's tessellation when there is one
+        shape = self._shape_cache.get(gid)
+        if shape is None:
+            shape = ifcopenshell.geom.create_shape(self.settings, self._lookup[gid])
+        return shape
+
+    def _index_products(self, ifc_file):
+        self._lookup = {product.GlobalId: product for product in ifc_file.by_type("IfcProduct")}
+
+    def _reset_shapes(self):
+        self._shape_cache.clear()
+        self._shape.cache_clear()
+        self._lookup = {}
+
+    def get_vertices(self, shape):
+        # Returns the shape's vertices as an (n, 3) float64 array. The raw vertex
+        # buffer is viewed in place, so large meshes are not copied into Python floats.
+        geometry = getattr(shape, 'geometry', shape)
+        verts_buffer = getattr(geometry, 'verts_buffer', None)
+        if verts_buffer is not None:
+            return np.frombuffer(verts_buffer, dtype=np.float64).reshape(-1, 3)
+        return np.asarray(geometry.verts, dtype=np.float64).reshape(-1, 3)
+
     def get_element_material(self, element):
         if element.HasAssociations:
             for association in element.HasAssociations:
@@ -136,14 +203,13 @@ class IFCInterface:
         return materials
     
     def calculate_window_ratio(self, ifc_file):
-        total_wall_area = 0
-        total_window_area = 0
-        for wall in ifc_file.by_type("IfcWall"):
-            wall_shape = ifcopenshell.geom.create_shape(self.settings, wall)
-            total_wall_area += wall_shape.area
-        for window in ifc_file.by_type("IfcWindow"):
-            window_shape = ifcopenshell.geom.create_shape(self.settings, window)
-            total_window_area += window_shape.area
+        walls = ifc_file.by_type("IfcWall")
+        windows = ifc_file.by_type("IfcWindow")
+        shapes = self._iter_shapes(ifc_file, walls + windows)
+        total_wall_area = sum(ifcopenshell.util.shape.get_area(shapes[wall.GlobalId].geometry)
+                              for wall in walls if wall.GlobalId in shapes)
+        total_window_area = sum(ifcopenshell.util.shape.get_area(shapes[window.GlobalId].geometry)
+                                for window in windows if window.GlobalId in shapes)
         return total_window_area / total_wall_area if total_wall_area > 0 else 0
 
     def get_hvac_type(self, ifc_file):
@@ -184,9 +250,10 @@ class IFCInterface:
 
     def add_windows(self, ifc_file, building, window_ratio):
         # TODO: Implement more complex window addition logic
+        self._index_products(ifc_file)
         for wall in ifc_file.by_type("IfcWall"):
-            wall_shape = ifcopenshell.geom.create_shape(self.settings, wall)
-            window_area = wall_shape.area * window_ratio
+            wall_shape = self._shape(wall.GlobalId)
+            window_area = ifcopenshell.util.shape.get_area(wall_shape.geometry) * window_ratio
             window = ifc_file.createIfcWindow(
                 ifcopenshell.guid.new(),
                 self.owner_history,
@@ -7,15 +7,38 @@
 
 import sqlite3
 import pickle
+import json
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-import numpy as np
+from statistics import fmean
+
+# Per-objective score columns on the buildings table, in the order EvolutionaryAlgorithm.evaluate_genome returns them
+OBJECTIVE_COLUMNS = ('safety', 'structural', 'livability', 'energy', 'cost', 'pedestrian_flow', 'blast_resistance')
+
+INSERT_BUILDING_SQL = '''
+    INSERT INTO buildings (genome, fitness_scores, overall_fitness, creation_date, {})
+    VALUES (?, ?, ?, ?, {})
+'''.format(', '.join(OBJECTIVE_COLUMNS), ', '.join('?' * len(OBJECTIVE_COLUMNS)))
+
+SELECT_BUILDING_SQL = 'SELECT id, genome, fitness_scores, overall_fitness, creation_date FROM buildings'
+# Ids bound per IN (...) query, below SQLite's default limit of 999 host parameters
+GET_BUILDINGS_BATCH = 500
 
 class Database:
     def __init__(self, db_file):
-        self.conn = sqlite3.connect(db_file)
+        # One connection shared across threads (GA workers, report threads, the UI); every
+        # use of the shared cursor is serialised by a re-entrant lock so transaction() can nest writes
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._lock = threading.RLock()
         self.cursor = self.conn.cursor()
+        # WAL with NORMAL sync avoids an fsync of the main database file on every commit
+        self.cursor.execute("PRAGMA journal_mode=WAL")
+        self.cursor.execute("PRAGMA synchronous=NORMAL")
+        self._transaction_depth = 0
         self.create_tables()
         self.check_and_update_schema()
+        self.create_indexes()
 
     def create_tables(self):
         # Create buildings table
@@ -25,9 +48,10 @@ class Database:
                 genome BLOB,
                 fitness_scores BLOB,
                 overall_fitness REAL,
-                creation_date TIMESTAMP
+                creation_date TIMESTAMP,
+                {}
             )
-        ''')
+        '''.format(',\n                '.join(f'{column} REAL' for column in OBJECTIVE_COLUMNS)))
 
         # Create optimisation_history table
         self.cursor.execute('''
@@ -48,58 +72,173 @@ class Database:
         if 'overall_fitness' not in columns:
             self.cursor.execute("ALTER TABLE buildings ADD COLUMN overall_fitness REAL")
             self.conn.commit()
-  
+
+        for column in OBJECTIVE_COLUMNS:
+            if column not in columns:
+                self.cursor.execute(f"ALTER TABLE buildings ADD COLUMN {column} REAL")
+        self.conn.commit()
+
+    def create_indexes(self):
+        # Runs after the schema check so legacy databases already have overall_fitness
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_oh_gen ON optimisation_history(generation)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_b_fit ON buildings(overall_fitness DESC)")
+        self.conn.commit()
 
     def save_building(self, genome, fitness_scores):
+        row = self._building_row(genome, fitness_scores, datetime.now())
+        with self._lock:
+            self.cursor.execute(INSERT_BUILDING_SQL, row)
+            self._commit()
+            return self.cursor.lastrowid
+
+    def save_buildings(self, pairs):
+        # Bulk insert of (genome, fitness_scores) pairs, e.g. a whole generation; rows are
+        # serialised up front so executemany runs the prepared statement in one pass
+        timestamp = datetime.now()
+        data = [self._building_row(genome, fitness_scores, timestamp) for genome, fitness_scores in pairs]
+        with self._lock:
+            self.cursor.executemany(INSERT_BUILDING_SQL, data)
+            self._commit()
+        return len(data)
+
+    def _building_row(self, genome, fitness_scores, timestamp):
+        # The genome is an arbitrary object graph so it stays pickled; the scores are
+        # stored as JSON plus one REAL column per objective so they can be queried in SQL
         genome_blob = pickle.dumps(genome)
-        fitness_blob = pickle.dumps(fitness_scores)
-        
+        fitness_json = self._dumps(fitness_scores)
+
         # Calculate an overall fitness score (e.g., average of all objectives)
-        overall_fitness = np.mean(fitness_scores)
-        
-        self.cursor.execute('''
-            INSERT INTO buildings (genome, fitness_scores, overall_fitness, creation_date)
-            VALUES (?, ?, ?, ?)
-        ''', (genome_blob, fitness_blob, overall_fitness, datetime.now()))
-        self.conn.commit()
-        return self.cursor.lastrowid
+        scores = fitness_scores.values() if isinstance(fitness_scores, dict) else fitness_scores
+        overall_fitness = fmean(scores)
+
+        return (genome_blob, fitness_json, overall_fitness, timestamp, *self._objective_values(fitness_scores))
 
     def get_building(self, building_id):
-        self.cursor.execute('SELECT * FROM buildings WHERE id = ?', (building_id,))
-        row = self.cursor.fetchone()
+        with self._lock:
+            self.cursor.execute(f'{SELECT_BUILDING_SQL} WHERE id = ?', (building_id,))
+            row = self.cursor.fetchone()
         if row:
-            return {
-                'id': row[0],
-                'genome': pickle.loads(row[1]),
-                'fitness_scores': pickle.loads(row[2]),
-                'overall_fitness': row[3],
-                'creation_date': row[4]
-            }
+            return self._building_from_row(row)
         return None
 
+    def get_buildings(self, building_ids):
+        # Bulk get_building: one SELECT ... WHERE id IN (...) per GET_BUILDINGS_BATCH ids rather than
+        # one query per id; returns {id: building} for the ids that exist
+        building_ids = list(dict.fromkeys(building_ids))
+        rows = []
+        with self._lock:
+            for start in range(0, len(building_ids), GET_BUILDINGS_BATCH):
+                batch = building_ids[start:start + GET_BUILDINGS_BATCH]
+                self.cursor.execute(f"{SELECT_BUILDING_SQL} WHERE id IN ({', '.join('?' * len(batch))})", batch)
+                rows += self.cursor.fetchall()
+        return {row[0]: self._building_from_row(row) for row in rows}
+
+    def _building_from_row(self, row):
+        return {
+            'id': row[0],
+            'genome': pickle.loads(row[1]),
+            'fitness_scores': self._loads(row[2]),
+            'overall_fitness': row[3],
+            'creation_date': row[4]
+        }
+
+    def get_top_buildings(self, limit=10):
+        # Reads only the scalar score columns, so no genome is unpickled
+        with self._lock:
+            self.cursor.execute('''
+                SELECT id, overall_fitness, creation_date, {}
+                FROM buildings ORDER BY overall_fitness DESC LIMIT ?
+            '''.format(', '.join(OBJECTIVE_COLUMNS)), (limit,))
+            rows = self.cursor.fetchall()
+        return [
+            {'id': row[0], 'overall_fitness': row[1], 'creation_date': row[2], **dict(zip(OBJECTIVE_COLUMNS, row[3:]))}
+            for row in rows
+        ]
+
+    @staticmethod
+    def _objective_values(fitness_scores):
+        if isinstance(fitness_scores, dict):
+            return [fitness_scores.get(column) for column in OBJECTIVE_COLUMNS]
+        if len(fitness_scores) == len(OBJECTIVE_COLUMNS):
+            return [float(score) for score in fitness_scores]
+        return [None] * len(OBJECTIVE_COLUMNS)
+
+    @staticmethod
+    def _json_default(value):
+        # NumPy arrays and scalars
+        if hasattr(value, 'tolist'):
+            return value.tolist()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    @staticmethod
+    def _dumps(value):
+        # Scores and history entries are plain numbers, lists and dicts, so JSON is
+        # smaller and faster to decode than pickle
+        return json.dumps(value, default=Database._json_default)
+
+    @staticmethod
+    def _loads(blob):
+        # Rows written before scores were stored as JSON hold pickled bytes
+        if isinstance(blob, bytes):
+            return pickle.loads(blob)
+        return json.loads(blob)
+
     def save_optimisation_history(self, generation, best_fitness, average_fitness):
-        best_fitness_blob = pickle.dumps(best_fitness)
-        average_fitness_blob = pickle.dumps(average_fitness)
-        self.cursor.execute('''
-            INSERT INTO optimisation_history (generation, best_fitness, average_fitness, timestamp)
-            VALUES (?, ?, ?, ?)
-        ''', (generation, best_fitness_blob, average_fitness_blob, datetime.now()))
-        self.conn.commit()
+        self.save_optimisation_history_batch([(generation, best_fitness, average_fitness)])
+
+    def save_optimisation_history_batch(self, rows):
+        # rows: iterable of (generation, best_fitness, average_fitness), written with one executemany
+        timestamp = datetime.now()
+        data = [(generation, self._dumps(best_fitness), self._dumps(average_fitness), timestamp)
+                for generation, best_fitness, average_fitness in rows]
+        with self._lock:
+            self.cursor.executemany('''
+                INSERT INTO optimisation_history (generation, best_fitness, average_fitness, timestamp)
+                VALUES (?, ?, ?, ?)
+            ''', data)
+            self._commit()
+
+    @contextmanager
+    def transaction(self):
+        # Groups several writes into a single commit, e.g. one per GA run instead of one per generation.
+        # Nested transactions join the outermost one; other threads wait until it finishes.
+        with self._lock:
+            self._transaction_depth += 1
+            try:
+                yield self
+            except BaseException:
+                # Also on KeyboardInterrupt / GeneratorExit, so the depth never stays raised
+                if self._transaction_depth == 1:
+                    self.conn.rollback()
+                raise
+            else:
+                if self._transaction_depth == 1:
+                    self.conn.commit()
+            finally:
+                self._transaction_depth -= 1
+
+    def _commit(self):
+        # Writes inside transaction() are committed once when it exits
+        if self._transaction_depth == 0:
+            self.conn.commit()
 
     def get_optimisation_history(self):
-        self.cursor.execute('SELECT * FROM optimisation_history ORDER BY generation')
+        with self._lock:
+            self.cursor.execute('SELECT * FROM optimisation_history ORDER BY generation')
+            rows = self.cursor.fetchall()
         history = []
-        for row in self.cursor.fetchall():
+        for row in rows:
             history.append({
                 'generation': row[1],
-                'best_fitness': pickle.loads(row[2]),
-                'average_fitness': pickle.loads(row[3]),
+                'best_fitness': self._loads(row[2]),
+                'average_fitness': self._loads(row[3]),
                 'timestamp': row[4]
             })
         return history
 
     def close(self):
-        self.conn.close()
+        with self._lock:
+            self.conn.close()
 
 # Example use case
 if __name__ == "__main__":
@@ -2,7 +2,27 @@
 
 ## Implements the `Decoder` class, which decodes a `BuildingGenome` object into an architectural design.
 
+import numpy as np
+from ..genetic_algorithm.encoding import GENOME_DTYPE
+
+# Child order of each top-level gene, as laid out by BuildingGenome
+DESIGN_SCHEMA = tuple((key, GENOME_DTYPE[key].names) for key in GENOME_DTYPE.names)
+
+def _compile_decode(schema):
+    # The schema is fixed, so decode is generated once as a single dict literal of
+    # straight-line attribute loads instead of dispatching to one method per section
+    sections = []
+    for key, fields in schema:
+        values = ', '.join(f"{field!r}: genes.{key}.children[{i}].value" for i, field in enumerate(fields))
+        sections.append(f"{key!r}: {{{values}}}")
+    source = "def decode(genome):\n    genes = genome.genes\n    return {" + ', '.join(sections) + "}\n"
+    namespace = {}
+    exec(source, namespace)
+    return namespace['decode']
+
 class Decoder:
+    _decode_genome = staticmethod(_compile_decode(DESIGN_SCHEMA))
+
     def __init__(self):
         self.decoding_schemes = {
             'building_envelope': self.decode_building_envelope,
@@ -13,10 +33,22 @@ class Decoder:
         }
 
     def decode(self, genome):
-        architectural_design = {}
-        for key, decode_func in self.decoding_schemes.items():
-            architectural_design[key] = decode_func(genome.genes[key])
-        return architectural_design
+        # Accepts a BuildingGenome or GENOME_DTYPE records (see BuildingGenome.as_soa / population_as_soa)
+        if isinstance(genome, (np.ndarray, np.void)):
+            return self.decode_records(genome)
+        return self._decode_genome(genome)
+
+    def decode_records(self, records):
+        # A single record gives one design, a 1-D record array gives a list of designs
+        records = np.asarray(records)
+        rows = records.tolist()
+        if records.ndim == 0:
+            return self._row_to_design(rows)
+        return [self._row_to_design(row) for row in rows]
+
+    @staticmethod
+    def _row_to_design(row):
+        return {key: dict(zip(fields, values)) for (key, fields), values in zip(DESIGN_SCHEMA, row)}
 
     def decode_building_envelope(self, gene):
         return {
@@ -2,7 +2,7 @@
 
 ## Implements the `Encoder` class, which encodes an architectural design into a `BuildingGenome` object.
 
-from ..genetic_algorithm.encoding import BuildingGenome, HierarchicalGene
+from ..genetic_algorithm.encoding import BuildingGenomeFlat, HierarchicalGene
 
 class Encoder:
     def __init__(self):
@@ -15,10 +15,31 @@ class Encoder:
         }
 
     def encode(self, architectural_design):
-        genome = BuildingGenome()
-        for key, encode_func in self.encoding_schemes.items():
-            genome.genes[key] = encode_func(architectural_design[key])
-        return genome
+        return self.encode_flat(architectural_design).to_tree()
+
+    def encode_flat(self, architectural_design):
+        # One constructor call instead of a HierarchicalGene per field
+        envelope = architectural_design['building_envelope']
+        structure = architectural_design['structural_system']
+        floors = architectural_design['floor_plans']
+        mep = architectural_design['mep_systems']
+        facade = architectural_design['facade']
+        return BuildingGenomeFlat(
+            height=envelope['height'],
+            width=envelope['width'],
+            length=envelope['length'],
+            shape=envelope['shape'],
+            structural_material=structure['material'],
+            frame_type=structure['frame_type'],
+            num_floors=floors['num_floors'],
+            floor_height=floors['floor_height'],
+            hvac_type=mep['hvac_type'],
+            lighting_type=mep['lighting_type'],
+            plumbing_type=mep['plumbing_type'],
+            renewable_energy=mep['renewable_energy'],
+            window_ratio=facade['window_ratio'],
+            facade_material=facade['material'],
+        )
 
     def encode_building_envelope(self, envelope_data):
         return HierarchicalGene('building_envelope', None, [
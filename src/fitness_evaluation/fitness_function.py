@@ -6,8 +6,16 @@
 ## 3. Calculate the total score of the building design
 ## 4. Provide the scores and weighted scores of the building design
 
-import traceback
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
 class FitnessFunction:
+    # Order of the processed scores and of the weight vector
+    OBJECTIVES = ('safety', 'structural', 'livability', 'energy', 'cost')
+
     def __init__(self, weights=None):
         if weights is None:
             weights = {
@@ -18,51 +26,44 @@ class FitnessFunction:
                 'cost': 0.1
             }
         self.weights = weights
+        self._refresh_weight_vector()
 
     def evaluate(self, genome, evaluate_genome_func):
         try:
-            print("Starting genome evaluation")
-            scores = evaluate_genome_func(genome)
-          
-            scores = {
-                'safety': (scores[0] + scores[5] + scores[6]) / 3,
-                'structural': scores[1],
-                'livability': scores[2],
-                'energy': scores[3],
-                'cost': scores[4]
-            }
-         
-            weighted_scores = {key: self.weights[key] * score for key, score in scores.items()}
-         
-            total_score = sum(weighted_scores.values())
-            print(f"Processed Scores: {scores}, Weighted Scores: {weighted_scores}, Total score: {total_score}")
+            logger.debug("Starting genome evaluation")
+            processed = self._process(evaluate_genome_func(genome))
+            weighted = self._weight_vector * processed
+            total_score = float(weighted.sum())
+
+            scores = dict(zip(self.OBJECTIVES, processed.tolist()))
+            weighted_scores = dict(zip(self.OBJECTIVES, weighted.tolist()))
+            logger.debug("Processed Scores: %s, Weighted Scores: %s, Total score: %s", scores, weighted_scores, total_score)
 
             return scores, weighted_scores, total_score
         
         except Exception as e:
-            print(f"Error in FitnessFunction.evaluate: {str(e)}")
-            print(traceback.format_exc())
+            # The traceback is only formatted when debug logging is on
+            logger.error("Error in FitnessFunction.evaluate: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return {}, {}, 0
 
+    def evaluate_batch(self, scores):
+        # Total score of each row of a (population, 7) array of raw objective scores
+        scores = np.asarray(scores, dtype=np.float64)
+        processed = np.column_stack([(scores[:, 0] + scores[:, 5] + scores[:, 6]) / 3, scores[:, 1:5]])
+        return processed @ self._weight_vector
 
-    # def evaluate(self, genome, evaluate_genome_func):
-    #     scores = evaluate_genome_func(genome)
-
-    #     scores = {
-    #         'safety': (scores[0] + scores[5] + scores[6]) / 3,  # Average of safety, pedestrian flow, and blast resistance
-    #         'structural': scores[1],
-    #         'livability': scores[2],
-    #         'energy': scores[3],
-    #         'cost': scores[4]
-    #     }
-
-    #     weighted_scores = {key: self.weights[key] * score for key, score in scores.items()}
-    #     total_score = sum(weighted_scores.values())
-
-    #     return scores, weighted_scores, total_score
+    @staticmethod
+    def _process(raw):
+        raw = np.asarray(raw, dtype=np.float64)
+        # Safety combines the safety, pedestrian flow and blast resistance objectives
+        return np.array([(raw[0] + raw[5] + raw[6]) / 3, raw[1], raw[2], raw[3], raw[4]])
 
     def update_weights(self, new_weights):
         self.weights.update(new_weights)
+        self._refresh_weight_vector()
+
+    def _refresh_weight_vector(self):
+        self._weight_vector = np.array([self.weights[key] for key in self.OBJECTIVES], dtype=np.float64)
 
 # Example use
 if __name__ == "__main__":
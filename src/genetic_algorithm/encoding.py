@@ -3,86 +3,325 @@
 ## Defines the structure of the `BuildingGenome`,  including:
 ## - the `HierarchicalGene` structure
 ## - methods for mutation and crossover.
+## - a structured NumPy view of one genome or a whole population.
+## - the `GenomePopulation` structure-of-arrays used to breed whole generations at once.
+
+import io
+import numbers
+from collections import namedtuple
+from dataclasses import dataclass
 
 import numpy as np
 
+# Structured record of one genome, grouped by top-level gene in the same child order
+GENOME_DTYPE = np.dtype([
+    ('building_envelope', [('height', 'f8'), ('width', 'f8'), ('length', 'f8'), ('shape', 'U16')]),
+    ('structural_system', [('material', 'U16'), ('frame_type', 'U16')]),
+    ('floor_plans', [('num_floors', 'f8'), ('floor_height', 'f8')]),
+    ('mep_systems', [('hvac_type', 'U16'), ('lighting_type', 'U16'), ('plumbing_type', 'U16'), ('renewable_energy', '?')]),
+    ('facade', [('window_ratio', 'f8'), ('material', 'U16')]),
+])
+
+# Allowed values of each categorical gene; population arrays store the int8 index into these
+CATEGORIES = {
+    ('building_envelope', 'shape'): ('rectangular', 'L-shaped', 'U-shaped'),
+    ('structural_system', 'material'): ('concrete', 'steel', 'wood'),
+    ('structural_system', 'frame_type'): ('moment frame', 'braced frame', 'shear wall'),
+    ('mep_systems', 'hvac_type'): ('central', 'distributed', 'hybrid'),
+    ('mep_systems', 'lighting_type'): ('LED', 'fluorescent', 'incandescent'),
+    ('mep_systems', 'plumbing_type'): ('central', 'distributed'),
+    ('facade', 'material'): ('glass', 'metal', 'composite'),
+}
+# Label -> code lookup for each categorical gene, built once at import
+CATEGORY_INDEX = {name: {label: code for code, label in enumerate(labels)} for name, labels in CATEGORIES.items()}
+
+# Leaf genes in tree order as (gene, field); numeric ones are the genes mutate() scales
+GENE_FIELDS = tuple((key, field) for key in GENOME_DTYPE.names for field in GENOME_DTYPE[key].names)
+NUMERIC_FIELDS = tuple((key, field) for key, field in GENE_FIELDS if GENOME_DTYPE[key][field].kind == 'f')
+# (gene, child index) of each numeric field in the HierarchicalGene tree
+NUMERIC_POSITIONS = tuple((key, GENOME_DTYPE[key].names.index(field)) for key, field in NUMERIC_FIELDS)
+
+# Flat (height, width, ..., window_ratio, facade_material) view of one genome's leaf values, for the
+# simulators; the facade material is prefixed to keep it apart from the structural material
+Traits = namedtuple('Traits', [f'{key}_{field}' if key == 'facade' and field == 'material' else field for key, field in GENE_FIELDS])
+
+class Genes(namedtuple('Genes', GENOME_DTYPE.names)):
+    # The five top-level genes of a BuildingGenome in GENOME_DTYPE order. Attribute access
+    # (genes.facade) is the fast path; genes['facade'], keys(), values() and items() keep the
+    # dict-style access used by the simulators and the rest of the code working.
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        return self._fields
+
+    def values(self):
+        return tuple(self)
+
+    def items(self):
+        return zip(self._fields, self)
+
+# Used when no Generator is passed in; seeded runs pass their own (see EvolutionaryAlgorithm)
+_default_rng = np.random.default_rng()
+
+def _is_numeric(value):
+    # Numbers are mutated; strings and booleans (including NumPy's) are left alone
+    return isinstance(value, numbers.Real) and not isinstance(value, (bool, np.bool_))
+
 class HierarchicalGene:
     def __init__(self, name, value, children=None):
         self.name = name
         self.value = value
         self.children = children or []
     
-    def mutate(self, mutation_rate):
-        if np.random.random() < mutation_rate:
-            if isinstance(self.value, (int, float)):
-                self.value *= np.random.uniform(0.8, 1.2)
-            elif isinstance(self.value, str):
-                pass
-            elif isinstance(self.value, bool):
-                self.value = not self.value
-
-        for child in self.children:
-            child.mutate(mutation_rate)
+    def mutate(self, mutation_rate, rng=None):
+        # Collects the subtree first so the random numbers come from two vectorised draws. Descendants
+        # can be shared with other genomes after crossover, so changed ones are replaced, not updated.
+        rng = rng or _default_rng
+        nodes = [self]
+        for node in nodes:
+            nodes.extend(node.children)
+        hits = [node for node, draw in zip(nodes, rng.random(len(nodes)))
+                if draw < mutation_rate and _is_numeric(node.value)]
+        factors = {id(node): factor for node, factor in zip(hits, rng.uniform(0.8, 1.2, len(hits)))}
+        if id(self) in factors:
+            self.value *= factors[id(self)]
+        self.children = [_scaled_copy(child, factors) for child in self.children]
+
+def _scaled_copy(node, factors):
+    # node with its values scaled by factors (keyed by node id), copying only nodes on a changed path
+    children = [_scaled_copy(child, factors) for child in node.children]
+    if id(node) not in factors and all(new is old for new, old in zip(children, node.children)):
+        return node
+    return HierarchicalGene(node.name, node.value * factors.get(id(node), 1), children)
 
 class BuildingGenome:
-    def __init__(self):
-        self.genes = {
-            'building_envelope': HierarchicalGene('building_envelope', None, [
-                HierarchicalGene('height', np.random.uniform(10, 100)),
-                HierarchicalGene('width', np.random.uniform(20, 100)),
-                HierarchicalGene('length', np.random.uniform(20, 100)),
-                HierarchicalGene('shape', np.random.choice(['rectangular', 'L-shaped', 'U-shaped'])),
+    def __init__(self, rng=None):
+        rng = rng or _default_rng
+        self.genes = Genes(
+            building_envelope=HierarchicalGene('building_envelope', None, [
+                HierarchicalGene('height', rng.uniform(10, 100)),
+                HierarchicalGene('width', rng.uniform(20, 100)),
+                HierarchicalGene('length', rng.uniform(20, 100)),
+                HierarchicalGene('shape', rng.choice(['rectangular', 'L-shaped', 'U-shaped'])),
             ]),
-            'structural_system': HierarchicalGene('structural_system', None, [
-                HierarchicalGene('material', np.random.choice(['concrete', 'steel', 'wood'])),
-                HierarchicalGene('frame_type', np.random.choice(['moment frame', 'braced frame', 'shear wall'])),
+            structural_system=HierarchicalGene('structural_system', None, [
+                HierarchicalGene('material', rng.choice(['concrete', 'steel', 'wood'])),
+                HierarchicalGene('frame_type', rng.choice(['moment frame', 'braced frame', 'shear wall'])),
             ]),
-            'floor_plans': HierarchicalGene('floor_plans', None, [
-                HierarchicalGene('num_floors', np.random.randint(1, 20)),
-                HierarchicalGene('floor_height', np.random.uniform(2.5, 4)),
+            floor_plans=HierarchicalGene('floor_plans', None, [
+                HierarchicalGene('num_floors', int(rng.integers(1, 20))),
+                HierarchicalGene('floor_height', rng.uniform(2.5, 4)),
             ]),
-            'mep_systems': HierarchicalGene('mep_systems', None, [
-                HierarchicalGene('hvac_type', np.random.choice(['central', 'distributed', 'hybrid'])),
-                HierarchicalGene('lighting_type', np.random.choice(['LED', 'fluorescent', 'incandescent'])),
-                HierarchicalGene('plumbing_type', np.random.choice(['central', 'distributed'])),
-                HierarchicalGene('renewable_energy', np.random.choice([True, False])),
+            mep_systems=HierarchicalGene('mep_systems', None, [
+                HierarchicalGene('hvac_type', rng.choice(['central', 'distributed', 'hybrid'])),
+                HierarchicalGene('lighting_type', rng.choice(['LED', 'fluorescent', 'incandescent'])),
+                HierarchicalGene('plumbing_type', rng.choice(['central', 'distributed'])),
+                HierarchicalGene('renewable_energy', rng.choice([True, False])),
             ]),
-            'facade': HierarchicalGene('facade', None, [
-                HierarchicalGene('window_ratio', np.random.uniform(0.1, 0.6)),
-                HierarchicalGene('material', np.random.choice(['glass', 'metal', 'composite'])),
+            facade=HierarchicalGene('facade', None, [
+                HierarchicalGene('window_ratio', rng.uniform(0.1, 0.6)),
+                HierarchicalGene('material', rng.choice(['glass', 'metal', 'composite'])),
             ]),
-        }
+        )
     
-    def mutate(self, mutation_rate=0.1):
-        for gene in self.genes.values():
-            gene.mutate(mutation_rate)
-
-    def crossover(self, other):
-        child = BuildingGenome()
-        for key, gene in self.genes.items():
-            if np.random.random() < 0.5:
-                child.genes[key] = self._deep_copy_gene(gene)
-            else:
-                child.genes[key] = self._deep_copy_gene(other.genes[key])
+    def mutate(self, mutation_rate=0.1, rng=None):
+        # Only numeric genes can change, so one draw decides which of them mutate. Leaf genes can
+        # be shared with other genomes after crossover, so a changed value gets a new leaf.
+        rng = rng or _default_rng
+        hits = np.flatnonzero(rng.random(len(NUMERIC_POSITIONS)) < mutation_rate)
+        for position, factor in zip(hits, rng.uniform(0.8, 1.2, len(hits))):
+            key, index = NUMERIC_POSITIONS[position]
+            children = getattr(self.genes, key).children
+            child = children[index]
+            if _is_numeric(child.value):
+                children[index] = HierarchicalGene(child.name, child.value * factor)
+
+    def crossover(self, other, rng=None):
+        # The child gets its own top-level genes but shares the parents' leaf genes (copy-on-write)
+        child = BuildingGenome.__new__(BuildingGenome)
+        draws = (rng or _default_rng).random(len(self.genes))
+        child.genes = Genes._make(self._share_gene(gene if draw < 0.5 else other_gene)
+                                  for gene, other_gene, draw in zip(self.genes, other.genes, draws))
         return child
     
-    def _deep_copy_gene(self, gene):
-        new_children = [self._deep_copy_gene(child) for child in gene.children]
-        return HierarchicalGene(gene.name, gene.value, new_children)
+    @classmethod
+    def from_values(cls, values):
+        # Builds a genome from leaf values in GENE_FIELDS order without drawing random defaults
+        genome = cls.__new__(cls)
+        values = iter(values)
+        genome.genes = Genes._make(
+            HierarchicalGene(key, None, [HierarchicalGene(field, next(values)) for field in GENOME_DTYPE[key].names])
+            for key in GENOME_DTYPE.names
+        )
+        return genome
+
+    def __setstate__(self, state):
+        # Genomes pickled before Genes existed (e.g. rows already in the database) hold a plain dict
+        if isinstance(state.get('genes'), dict):
+            state['genes'] = Genes(**state['genes'])
+        self.__dict__.update(state)
+
+    def as_soa(self):
+        # 0-d record array, e.g. genome.as_soa()['building_envelope']['height']
+        return np.array(self._record(), dtype=GENOME_DTYPE)
+
+    def traits(self):
+        # One flat namedtuple of the leaf values, read once instead of through genes[...].children[i].value chains
+        return Traits._make([child.value for gene in self.genes for child in gene.children])
+
+    def _record(self):
+        return tuple(tuple(child.value for child in gene.children) for gene in self.genes)
+
+    @staticmethod
+    def _share_gene(gene):
+        return HierarchicalGene(gene.name, gene.value, list(gene.children))
 
     def __str__(self):
         return self._gene_to_string(self.genes)
 
     def _gene_to_string(self, gene, indent=0):
-        if isinstance(gene, dict):
-            return '\n'.join(f"{' ' * indent}{key}: {self._gene_to_string(value, indent + 2)}" for key, value in gene.items())
-        elif isinstance(gene, HierarchicalGene):
-            result = f"{gene.name}: {gene.value}"
-            if gene.children:
-                result += '\n' + '\n'.join(self._gene_to_string(child, indent + 2) for child in gene.children)
-            return result
-        else:
-            return str(gene)
+        # Iterative pre-order walk writing one indented "name: value" line per gene
+        genes = [gene] if isinstance(gene, HierarchicalGene) else gene.values()
+        stack = [(gene, indent) for gene in reversed(genes)]
+        buffer = io.StringIO()
+        while stack:
+            gene, indent = stack.pop()
+            if buffer.tell():
+                buffer.write('\n')
+            buffer.write(f"{' ' * indent}{gene.name}: {gene.value}")
+            stack.extend((child, indent + 2) for child in reversed(gene.children))
+        return buffer.getvalue()
+
+def population_as_soa(genomes):
+    # One record per individual, so each trait is a contiguous column across the population
+    return np.array([genome._record() for genome in genomes], dtype=GENOME_DTYPE)
+
+@dataclass(frozen=True, slots=True)
+class BuildingGenomeFlat:
+    # All fourteen leaf genes in GENE_FIELDS order as one slotted object; frozen, so it is hashable
+    height: float
+    width: float
+    length: float
+    shape: str
+    structural_material: str
+    frame_type: str
+    num_floors: float
+    floor_height: float
+    hvac_type: str
+    lighting_type: str
+    plumbing_type: str
+    renewable_energy: bool
+    window_ratio: float
+    facade_material: str
+
+    @classmethod
+    def from_genome(cls, genome):
+        return cls(*(child.value for gene in genome.genes for child in gene.children))
+
+    def values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def to_tree(self):
+        # HierarchicalGene form used by the simulations, decoder and printing
+        return BuildingGenome.from_values(self.values())
+
+class GenomePopulation:
+    # Structure-of-arrays view of a population: one contiguous column per leaf gene,
+    # so crossover and mutation run as whole-population NumPy operations. Categorical
+    # genes are int8 codes into self.labels, which starts from CATEGORIES and is
+    # extended with any other value found in the genomes (e.g. an imported IFC material).
+    def __init__(self, columns, labels):
+        self.columns = columns
+        self.labels = labels
+
+    @classmethod
+    def from_genomes(cls, genomes):
+        columns, labels = {}, {}
+        for key, field in GENE_FIELDS:
+            index = GENOME_DTYPE[key].names.index(field)
+            values = [getattr(genome.genes, key).children[index].value for genome in genomes]
+            if (key, field) in CATEGORIES:
+                columns[(key, field)], labels[(key, field)] = _encode_categories(values, (key, field))
+            else:
+                columns[(key, field)] = np.array(values, dtype=GENOME_DTYPE[key][field])
+        return cls(columns, labels)
+
+    def __len__(self):
+        return len(self.columns[GENE_FIELDS[0]])
+
+    def take(self, indices):
+        return GenomePopulation({name: column[indices] for name, column in self.columns.items()}, self.labels)
+
+    def crossover(self, other, rng=None):
+        # Each child inherits every top-level gene whole from one parent, as BuildingGenome.crossover does
+        rng = rng or _default_rng
+        from_self = {key: rng.random(len(self)) < 0.5 for key in GENOME_DTYPE.names}
+        columns, labels = {}, dict(self.labels)
+        for (key, field), column in self.columns.items():
+            other_column = other.columns[(key, field)]
+            if (key, field) in labels and other.labels[(key, field)] != labels[(key, field)]:
+                # Populations built separately may have extended their labels differently
+                labels[(key, field)], column, other_column = _merge_categories(
+                    labels[(key, field)], column, other.labels[(key, field)], other_column)
+            columns[(key, field)] = np.where(from_self[key], column, other_column)
+        return GenomePopulation(columns, labels)
+
+    def mutate(self, mutation_rate=0.1, rng=None):
+        # Scales each numeric gene by U(0.8, 1.2) with probability mutation_rate; categorical genes are kept
+        rng = rng or _default_rng
+        size = len(self)
+        for name in NUMERIC_FIELDS:
+            column = self.columns[name]
+            mask = rng.random(size) < mutation_rate
+            column[mask] *= rng.uniform(0.8, 1.2, np.count_nonzero(mask))
+        return self
+
+    def to_genomes(self):
+        columns = []
+        for name in GENE_FIELDS:
+            column = self.columns[name]
+            if name in self.labels:
+                column = np.array(self.labels[name], dtype=object)[column]
+            columns.append(column.tolist())
+        return [BuildingGenome.from_values(values) for values in zip(*columns)]
+
+def category_codes(labels, name):
+    # int8 code of each label of a categorical record-array column (e.g. records['mep_systems']['hvac_type']);
+    # labels outside CATEGORIES[name] all get the code len(CATEGORIES[name])
+    known = CATEGORIES[name]
+    codes = np.full(np.shape(labels), len(known), dtype=np.int8)
+    for code, label in enumerate(known):
+        codes[labels == label] = code
+    return codes
+
+def category_lookup(labels, name, table, default):
+    # table[label] for each label of a categorical column, looked up by code; other labels get default
+    values = np.array([table.get(label, default) for label in CATEGORIES[name]] + [default])
+    return values[category_codes(labels, name)]
+
+def _encode_categories(values, name):
+    index = CATEGORY_INDEX[name]
+    codes = np.fromiter((index.get(value, -1) for value in values), dtype=np.int8, count=len(values))
+    if not (codes < 0).any():
+        return codes, CATEGORIES[name]
+
+    # Rare path: values outside CATEGORIES get codes after the known labels
+    index = dict(index)
+    for i in np.flatnonzero(codes < 0):
+        codes[i] = index.setdefault(values[i], len(index))
+    return codes, tuple(index)
+
+def _merge_categories(labels, codes, other_labels, other_codes):
+    index = {label: code for code, label in enumerate(labels)}
+    for label in other_labels:
+        index.setdefault(label, len(index))
+    remap = np.array([index[label] for label in other_labels], dtype=np.int8)
+    return tuple(index), codes, remap[other_codes]
 
 # Test the encoding
 if __name__ == "__main__":
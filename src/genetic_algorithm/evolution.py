@@ -5,10 +5,15 @@
 ## - Tournament selection
 ## - Evolving the population
 
-import traceback
+import hashlib
+import logging
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
-from .encoding import BuildingGenome
+from .encoding import BuildingGenome, GenomePopulation, population_as_soa
 from ..simulation_engine.structural_integrity import StructuralIntegrity
 from ..simulation_engine.energy_simulation import EnergySimulation
 from ..simulation_engine.safety_assessment import SafetyAssessment
@@ -18,19 +23,158 @@ from ..simulation_engine.pedestrian_flow import PedestrianFlowSimulation
 from ..simulation_engine.blast_resistance_simulation import BlastResistanceSimulation
 from ..fitness_evaluation.fitness_function import FitnessFunction
 
+logger = logging.getLogger(__name__)
+
+# Scores per genome, in the order evaluate_genome returns them
+OBJECTIVES = ('safety', 'structural', 'livability', 'energy', 'cost', 'pedestrian_flow', 'blast_resistance')
+
+def evaluate_safety(genome):
+    return SafetyAssessment(genome).assess()['overall_safety']
+
+def evaluate_structural(genome):
+    return StructuralIntegrity(genome).analyse()['overall_integrity']
+
+def evaluate_livability(genome):
+    return LivabilityEvaluation(genome).evaluate()['livability_score']
+
+def evaluate_energy(genome):
+    return EnergySimulation(genome).simulate()['energy_efficiency']
+
+def evaluate_cost(genome):
+    return CostEstimation(genome).estimate()['cost_score']
+
+def evaluate_pedestrian_flow(genome):
+    return PedestrianFlowSimulation(genome).simulate()['evacuation_efficiency']
+
+def evaluate_blast_resistance(genome):
+    return BlastResistanceSimulation(genome).simulate()['blast_resistance_score']
+
+# One module-level (picklable) evaluator per objective, aligned with OBJECTIVES
+OBJECTIVE_EVALUATORS = (evaluate_safety, evaluate_structural, evaluate_livability, evaluate_energy,
+                        evaluate_cost, evaluate_pedestrian_flow, evaluate_blast_resistance)
+
+# Objectives whose simulators score a whole GENOME_DTYPE record array in one call
+BATCH_EVALUATORS = {
+    'safety': SafetyAssessment.assess_batch,
+    'structural': StructuralIntegrity.analyse_batch,
+    'livability': LivabilityEvaluation.evaluate_batch,
+    'energy': EnergySimulation.simulate_batch,
+    'cost': CostEstimation.estimate_batch,
+    'blast_resistance': BlastResistanceSimulation.simulate_batch,
+}
+
+def evaluate_genome(genome):
+    # Module-level so worker processes can unpickle it by name
+    scores = np.array([evaluate(genome) for evaluate in OBJECTIVE_EVALUATORS])
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("All evaluations complete. Scores: %s", dict(zip(OBJECTIVES, scores.tolist())))
+    return scores
+
+def evaluate_population(genomes):
+    # (len(genomes), len(OBJECTIVES)) scores; batched objectives run once over the whole population,
+    # the remaining simulators once per genome
+    scores = np.empty((len(genomes), len(OBJECTIVES)))
+    records = population_as_soa(genomes)
+    for column, (objective, evaluate) in enumerate(zip(OBJECTIVES, OBJECTIVE_EVALUATORS)):
+        if objective in BATCH_EVALUATORS:
+            scores[:, column] = BATCH_EVALUATORS[objective](records)
+        else:
+            scores[:, column] = [evaluate(genome) for genome in genomes]
+    return scores
+
+def genome_key(genome):
+    # Canonical hash of every gene value; identical genomes share a key across generations
+    return hashlib.blake2b(genome.as_soa().tobytes(), digest_size=16).digest()
+
+class FitnessCache:
+    # Bounded LRU of genome_key -> scores with hit/miss counters. Converging populations, elites and
+    # NSGA-II's parent+offspring pool re-create many earlier genomes, which are then never re-simulated.
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._scores = OrderedDict()
+
+    def __len__(self):
+        return len(self._scores)
+
+    def evaluate(self, genomes, evaluate_genomes, known_scores=None):
+        # Returns the (len(genomes), n_objectives) scores; evaluate_genomes is called once with the
+        # distinct genomes missing from the cache. known_scores: optional {index: scores} stored first.
+        cache = self._scores
+        keys = [genome_key(genome) for genome in genomes]
+        for index, scores in (known_scores or {}).items():
+            cache[keys[index]] = scores
+
+        missing = {}
+        for key, genome in zip(keys, genomes):
+            if key in cache:
+                cache.move_to_end(key)
+            elif key not in missing:
+                missing[key] = genome
+        if missing:
+            for key, scores in zip(missing, evaluate_genomes(list(missing.values()))):
+                cache[key] = scores
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        fitness_scores = np.empty((len(keys), len(cache[keys[0]]) if keys else 0))
+        for i, key in enumerate(keys):
+            fitness_scores[i] = cache[key]
+        while len(cache) > self.maxsize:
+            cache.popitem(last=False)
+        return fitness_scores
+
+# Evaluation pools are often started from a multi-threaded process (the UI runs evolve() on a QThread),
+# where fork() can deadlock the workers, so they are spawned; the worker functions are module-level
+WORKER_CONTEXT = multiprocessing.get_context('spawn')
+
+def seed_worker():
+    # Reseed the global RNG in every worker so the stochastic simulations differ per worker
+    np.random.seed()
+
 class EvolutionaryAlgorithm:
-    def __init__(self, generations=100, population_size=100, mutation_rate=0.1, db_file="buildings.db"):
+    evaluate_genome = staticmethod(evaluate_genome)
+    evaluate_population = staticmethod(evaluate_population)
+
+    def __init__(self, generations=100, population_size=100, mutation_rate=0.1, db_file="buildings.db", n_workers=None, seed=None, elite_size=None):
         self.population_size = population_size
         self.mutation_rate = mutation_rate
-        self.population = [BuildingGenome() for _ in range(population_size)]
+        # The best elite_size genomes of each generation are carried over unchanged, with their scores
+        self.elite_size = min(population_size, max(1, population_size // 10) if elite_size is None else elite_size)
+        # Every random choice of the search (initial population, selection, crossover, mutation) draws
+        # from this Generator, so a fixed seed reproduces the sequence of populations
+        self.rng = np.random.default_rng(seed)
+        self.population = [BuildingGenome(self.rng) for _ in range(population_size)]
         self.generations = generations
         self.fitness_function = FitnessFunction()
-        self.all_fitness_scores = []
+        # Scores of every generation, preallocated as (generations, population_size, len(OBJECTIVES));
+        # the first _generations_recorded rows are filled, see all_fitness_scores
+        self._fitness_history = np.empty((generations, population_size, len(OBJECTIVES)))
+        self._generations_recorded = 0
+        # Genome evaluations are independent, so they are spread over a process pool (n_workers=1 evaluates in-process)
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self._pool = None
+        self.fitness_cache = FitnessCache(10 * population_size)
+
+    @property
+    def all_fitness_scores(self):
+        # Scores of every evaluated genome so far, generation after generation, as one (n, len(OBJECTIVES)) array
+        return self._fitness_history[:self._generations_recorded].reshape(-1, len(OBJECTIVES))
 
     def evolve(self, progress_callback=None):
+        try:
+            return self._evolve(progress_callback)
+        finally:
+            self.shutdown()
+
+    def _evolve(self, progress_callback):
+        self._reserve_history(self.generations)
+        known_scores = None
         for generation in range(self.generations):
-            fitness_scores = self.evaluate_fitness()
-            self.all_fitness_scores.extend(fitness_scores.tolist())
+            fitness_scores = self.evaluate_fitness(known_scores)
+            self._fitness_history[self._generations_recorded] = fitness_scores
+            self._generations_recorded += 1
             
             best_fitness = np.max(fitness_scores, axis=0)
             avg_fitness = np.mean(fitness_scores, axis=0)
@@ -38,62 +182,92 @@ class EvolutionaryAlgorithm:
             if progress_callback:
                 progress_callback(generation, best_fitness, avg_fitness)
           
-            print(f"Generation {generation + 1}: Best Fitness = {best_fitness}, Avg Fitness = {avg_fitness}")
+            logger.info("Generation %d: Best Fitness = %s, Avg Fitness = %s", generation + 1, best_fitness, avg_fitness)
+            logger.debug("Fitness cache: %d hits, %d misses", self.fitness_cache.hits, self.fitness_cache.misses)
 
             if generation < self.generations - 1:  # Don't create offspring for the last generation
-                offspring = self.create_offspring(fitness_scores)
-                self.population = offspring
+                self.population, known_scores = self.next_generation(fitness_scores)
                 
-        final_fitness_scores = self.evaluate_fitness()
-        best_index = np.argmax(np.mean(final_fitness_scores, axis=1))
-        return self.population[best_index], final_fitness_scores 
-
-    def evaluate_fitness(self):
-        fitness_scores = []
-        for genome in self.population:
-            scores = self.evaluate_genome(genome)
-            fitness_scores.append(scores)
-        return np.array(fitness_scores)
-
-    @staticmethod
-    def evaluate_genome(genome):
-        safety_score = SafetyAssessment(genome).assess()['overall_safety']
-        structural_score = StructuralIntegrity(genome).analyse()['overall_integrity']
-        livability_score = LivabilityEvaluation(genome).evaluate()['livability_score']
-        energy_score = EnergySimulation(genome).simulate()['energy_efficiency']
-        cost_score = CostEstimation(genome).estimate()['cost_score']
-        pedestrian_flow_score = PedestrianFlowSimulation(genome).simulate()['evacuation_efficiency']
-        blast_resistance_score = BlastResistanceSimulation(genome).simulate()['blast_resistance_score']
-      
-        print(f"All evaluations complete. Scores: safety={safety_score}, structural={structural_score}, "
-                f"livability={livability_score}, energy={energy_score}, cost={cost_score}, "
-                f"pedestrian_flow={pedestrian_flow_score}, blast_resistance={blast_resistance_score}")
-
-        return np.array([safety_score, structural_score, livability_score, energy_score, cost_score, 
-                pedestrian_flow_score, blast_resistance_score])
+        # The last generation is not replaced, so its scores already belong to self.population
+        if self.generations < 1:
+            fitness_scores = self.evaluate_fitness()
+        best_index = np.argmax(np.mean(fitness_scores, axis=1))
+        return self.population[best_index], fitness_scores
+
+    def _reserve_history(self, generations):
+        # Grow the score buffer when evolve() runs more generations than were allocated for (e.g. a second call)
+        needed = self._generations_recorded + generations
+        if needed > len(self._fitness_history):
+            history = np.empty((needed,) + self._fitness_history.shape[1:])
+            history[:self._generations_recorded] = self._fitness_history[:self._generations_recorded]
+            self._fitness_history = history
+
+    def evaluate_fitness(self, known_scores=None):
+        # known_scores: optional {population index: scores} for genomes already evaluated (e.g. elites)
+        return self.fitness_cache.evaluate(self.population, self._evaluate_genomes, known_scores)
+
+    def _evaluate_genomes(self, genomes):
+        if not genomes:
+            return np.empty((0, len(OBJECTIVES)))
+        pool = self._get_pool()
+        if pool is None or len(genomes) <= 1:
+            return self.evaluate_population(genomes)
+        # Each worker scores a slice of the population so the batched objectives stay vectorised
+        chunksize = -(-len(genomes) // (4 * self.n_workers))
+        chunks = [genomes[i:i + chunksize] for i in range(0, len(genomes), chunksize)]
+        return np.concatenate(list(pool.map(self.evaluate_population, chunks)))
+
+    def _get_pool(self):
+        # Started on first use and reused for every generation of the run
+        if self.n_workers <= 1:
+            return None
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.n_workers, mp_context=WORKER_CONTEXT, initializer=seed_worker)
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
      
-    def create_offspring(self, fitness_scores):
-        offspring = []
-        while len(offspring) < self.population_size:
-            parent1 = self.tournament_selection(fitness_scores)
-            parent2 = self.tournament_selection(fitness_scores)
-            child = parent1.crossover(parent2)
-            child.mutate(self.mutation_rate)
-            offspring.append(child)
-        return offspring
+    def next_generation(self, fitness_scores):
+        # Elites first, then offspring; returns the new population and the elites' known scores
+        elite = np.argsort(np.mean(fitness_scores, axis=1))[::-1][:self.elite_size]
+        population = [self.population[i] for i in elite]
+        population += self.create_offspring(fitness_scores, self.population_size - len(elite))
+        return population, {index: fitness_scores[i] for index, i in enumerate(elite)}
+
+    def create_offspring(self, fitness_scores, count=None):
+        # Parents are gathered into column arrays so crossover and mutation run once per generation
+        count = self.population_size if count is None else count
+        parents = GenomePopulation.from_genomes(self.population)
+        winners = self.select_parents(fitness_scores, 2 * count)
+        children = parents.take(winners[:count]).crossover(parents.take(winners[count:]), self.rng)
+        children.mutate(self.mutation_rate, self.rng)
+        return children.to_genomes()
+
+    def select_parents(self, fitness_scores, count, tournament_size=3):
+        # Runs `count` tournaments from one batch of draws; the entrant with the best mean fitness
+        # wins. Entrants are drawn with replacement, which is equivalent for tournament selection
+        # and avoids the per-call cost of sampling without replacement.
+        mean_fitness = np.mean(fitness_scores, axis=1)
+        entrants = self.rng.integers(0, len(mean_fitness), size=(count, tournament_size))
+        return entrants[np.arange(count), np.argmax(mean_fitness[entrants], axis=1)]
 
     def tournament_selection(self, fitness_scores, tournament_size=3):
-        selected_indices = np.random.choice(len(self.population), tournament_size, replace=False)
-        tournament_fitness = np.mean(fitness_scores[selected_indices], axis=1)  # Calculate average fitness for each individual
-        winner_index = selected_indices[np.argmax(tournament_fitness)]
-        return self.population[winner_index]
+        return self.population[self.tournament_index(fitness_scores, tournament_size)]
+
+    def tournament_index(self, fitness_scores, tournament_size=3):
+        # Single tournament; create_offspring draws all of its tournaments at once with select_parents
+        return self.select_parents(fitness_scores, 1, tournament_size)[0]
 
 
 
 # Example use case
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     ea = EvolutionaryAlgorithm(population_size=100)
-    best_genome = ea.evolve()
+    best_genome, _ = ea.evolve()
     print(f"Best Genome: {best_genome}")
     
     # Evaluate the best genome
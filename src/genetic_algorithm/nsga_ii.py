@@ -14,145 +14,176 @@
 ## - https://www.sciencedirect.com/topics/computer-science/non-dominated-sorting-genetic-algorithm-ii
 ## - https://ieeexplore.ieee.org/document/996017
 
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
-from .encoding import BuildingGenome
-from ..simulation_engine.structural_integrity import StructuralIntegrity
-from ..simulation_engine.energy_simulation import EnergySimulation
-from ..simulation_engine.safety_assessment import SafetyAssessment
-from ..simulation_engine.livability_evaluation import LivabilityEvaluation
-from ..simulation_engine.cost_estimation import CostEstimation
-from ..simulation_engine.pedestrian_flow import PedestrianFlowSimulation
-from ..simulation_engine.blast_resistance_simulation import BlastResistanceSimulation
+from .encoding import BuildingGenome, GenomePopulation
+from .evolution import OBJECTIVES, WORKER_CONTEXT, FitnessCache, evaluate_population, seed_worker
+
+logger = logging.getLogger(__name__)
+
+# NSGA-II scores genomes in this order (structural first); the scores come from the EA's
+# evaluate_population, whose OBJECTIVES columns are reordered with _NSGA_COLUMNS
+NSGA_OBJECTIVES = ('structural', 'energy', 'safety', 'livability', 'cost', 'pedestrian_flow', 'blast_resistance')
+_NSGA_COLUMNS = [OBJECTIVES.index(objective) for objective in NSGA_OBJECTIVES]
 
 class NSGAII:
-    def __init__(self, population_size=100, mutation_rate=0.1):
+    evaluate_population = staticmethod(evaluate_population)
+
+    # Populations this small are evaluated in-process; pool dispatch would cost more than it saves
+    MIN_PARALLEL_POPULATION = 5
+
+    def __init__(self, population_size=100, mutation_rate=0.1, n_workers=None, seed=None):
         self.population_size = population_size
         self.mutation_rate = mutation_rate
-        self.population = [BuildingGenome() for _ in range(population_size)]
+        # Initial population, parent pairing, crossover and mutation all draw from this Generator
+        self.rng = np.random.default_rng(seed)
+        self.population = [BuildingGenome(self.rng) for _ in range(population_size)]
         self.generations = 100
+        # Started on first use and reused across generations (n_workers=1 evaluates in-process)
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self._pool = None
+        self.fitness_cache = FitnessCache(10 * population_size)
 
     def evolve(self):
+        try:
+            return self._evolve()
+        finally:
+            self.shutdown()
+
+    def _evolve(self):
+        # Every genome is simulated once; sorting, crowding and selection read the aligned score arrays
+        fitness_scores = self.evaluate_fitness()
         for generation in range(self.generations):
-            # 1. Evaluate fitness   
-            fitness_scores = self.evaluate_fitness()
-            # 2. Create offspring
+            # 1. Create offspring and evaluate them
             offspring = self.create_offspring()
-            # 3. Combine parents and offspring
+            offspring_scores = self.evaluate_fitness(offspring)
+            # 2. Combine parents and offspring
             combined_population = self.population + offspring
-            # 4. Non-dominated sorting
-            fronts = self.fast_non_dominated_sort(combined_population)
-            # 5. Calculate crowding distance
-            self.calculate_crowding_distance(fronts)
-            # 6. Select next generation
-            self.population = self.select_next_generation(fronts)
+            combined_scores = np.concatenate([fitness_scores, offspring_scores])
+            # 3. Non-dominated sorting
+            fronts = self.fast_non_dominated_sort(combined_population, combined_scores)
+            # 4. Calculate crowding distance
+            crowding_distances = self.calculate_crowding_distance(fronts, combined_scores)
+            # 5. Select next generation
+            selected = self.select_next_generation(fronts, crowding_distances)
 
             # Print generation stats
             self.print_generation_stats(generation, fitness_scores)
 
+            self.population = [combined_population[i] for i in selected]
+            fitness_scores = combined_scores[selected]
+
         return self.population[0]  # Return the best individual
 
-    def evaluate_fitness(self):
-        fitness_scores = []
-        for genome in self.population:
-            scores = self.evaluate_genome(genome)
-            fitness_scores.append(scores)
-        return np.array(fitness_scores)
-
-    def evaluate_genome(self, genome):
-        structural_integrity = StructuralIntegrity(genome).analyse()['overall_integrity']
-        energy_efficiency = EnergySimulation(genome).simulate()['energy_efficiency']
-        safety_score = SafetyAssessment(genome).assess()['overall_safety']
-        livability_score = LivabilityEvaluation(genome).evaluate()['livability_score']
-        cost_score = CostEstimation(genome).estimate()['cost_score']
-        pedestrian_flow_score = PedestrianFlowSimulation(genome).simulate()['evacuation_efficiency']
-        blast_resistance_score = BlastResistanceSimulation(genome).simulate()['blast_resistance_score']
-        
-        return [structural_integrity, energy_efficiency, safety_score, livability_score, cost_score, pedestrian_flow_score, blast_resistance_score]
+    def evaluate_fitness(self, population=None):
+        population = self.population if population is None else population
+        return self.fitness_cache.evaluate(population, self._evaluate_genomes)
+
+    def _evaluate_genomes(self, population):
+        if self.n_workers <= 1 or len(population) < self.MIN_PARALLEL_POPULATION:
+            scores = np.asarray(self.evaluate_population(population))
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.n_workers, mp_context=WORKER_CONTEXT, initializer=seed_worker)
+            # Each worker scores a contiguous slice so the batched objectives stay vectorised
+            chunksize = -(-len(population) // (4 * self.n_workers))
+            chunks = [population[i:i + chunksize] for i in range(0, len(population), chunksize)]
+            scores = np.concatenate(list(self._pool.map(self.evaluate_population, chunks)))
+        return scores[:, _NSGA_COLUMNS]
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
     def create_offspring(self):
-        offspring = []
-        while len(offspring) < self.population_size:
-            parent1, parent2 = np.random.choice(self.population, 2, replace=False)
-            child = parent1.crossover(parent2)
-            child.mutate(self.mutation_rate)
-            offspring.append(child)
-        return offspring
-
-    def fast_non_dominated_sort(self, population):
-        domination_counts = np.zeros(len(population))
-        dominated_solutions = [[] for _ in range(len(population))]
-        fronts = [[]]
-  
-        for i, p in enumerate(population):
-            for j, q in enumerate(population):
-                if i != j:
-                    if self.dominates(p, q):
-                        dominated_solutions[i].append(j)
-                    elif self.dominates(q, p):
-                        domination_counts[i] += 1
-            
-            if domination_counts[i] == 0:
-                fronts[0].append(i)
-        
-        i = 0
-        while fronts[i]:
-            next_front = []
-            for p in fronts[i]:
-                for q in dominated_solutions[p]:
-                    domination_counts[q] -= 1
-                    if domination_counts[q] == 0:
-                        next_front.append(q)
-            i += 1
-            fronts.append(next_front)
-
-        return fronts[:-1]  # Remove the last empty front
-
-    def dominates(self, p, q):
-        p_scores = self.evaluate_genome(p)
-        q_scores = self.evaluate_genome(q)
-        return all(p_scores[i] >= q_scores[i] for i in range(len(p_scores))) and any(p_scores[i] > q_scores[i] for i in range(len(p_scores)))
-
-    def calculate_crowding_distance(self, fronts):
+        # All parent pairs are drawn at once; the second parent is offset from the first so the two always differ
+        size = len(self.population)
+        first = self.rng.integers(0, size, self.population_size)
+        second = (first + self.rng.integers(1, size, self.population_size)) % size
+        # Crossover and mutation run over gene columns for the whole batch, as in EvolutionaryAlgorithm
+        parents = GenomePopulation.from_genomes(self.population)
+        children = parents.take(first).crossover(parents.take(second), self.rng)
+        return children.mutate(self.mutation_rate, self.rng).to_genomes()
+
+    def fast_non_dominated_sort(self, population, scores=None):
+        # Fronts of indices into population; scores[i] are the objectives of population[i]
+        if scores is None:
+            scores = self.evaluate_fitness(population)
+        scores = np.asarray(scores)
+        # dominates_matrix[i, j]: population[i] dominates population[j], from one broadcast comparison
+        dominates_matrix = ((scores[:, None, :] >= scores[None, :, :]).all(axis=-1)
+                            & (scores[:, None, :] > scores[None, :, :]).any(axis=-1))
+        domination_counts = dominates_matrix.sum(axis=0)
+
+        fronts = []
+        front = np.flatnonzero(domination_counts == 0)
+        while front.size:
+            fronts.append(front.tolist())
+            # Drop the front's domination of the rest, and mark the front itself as assigned
+            domination_counts -= dominates_matrix[front].sum(axis=0)
+            domination_counts[front] = -1
+            front = np.flatnonzero(domination_counts == 0)
+        return fronts
+
+    @staticmethod
+    def dominates(p_scores, q_scores):
+        return np.all(p_scores >= q_scores) and np.any(p_scores > q_scores)
+
+    def calculate_crowding_distance(self, fronts, scores):
+        # Crowding distance of every index in fronts, as an array aligned with scores
+        crowding_distances = np.zeros(len(scores))
         for front in fronts:
-            if len(front) > 2:
-                for obj in range(len(self.evaluate_genome(self.population[0]))):
-                    front_sorted = sorted(front, key=lambda x: self.evaluate_genome(self.population[x])[obj])
-                    self.population[front_sorted[0]].crowding_distance = float('inf')
-                    self.population[front_sorted[-1]].crowding_distance = float('inf')
-                    obj_range = (
-                        self.evaluate_genome(self.population[front_sorted[-1]])[obj] -
-                        self.evaluate_genome(self.population[front_sorted[0]])[obj]
-                    )
-                    for i in range(1, len(front_sorted) - 1):
-                        prev_obj = self.evaluate_genome(self.population[front_sorted[i-1]])[obj]
-                        next_obj = self.evaluate_genome(self.population[front_sorted[i+1]])[obj]
-                        if obj_range == 0:
-                            self.population[front_sorted[i]].crowding_distance += 0
-                        else:
-                            self.population[front_sorted[i]].crowding_distance += (next_obj - prev_obj) / obj_range
-
-    def select_next_generation(self, fronts):
+            front = np.asarray(front)
+            if len(front) <= 2:
+                crowding_distances[front] = float('inf')
+                continue
+            # Column j of order sorts the front by objective j
+            front_scores = scores[front]
+            order = np.argsort(front_scores, axis=0, kind='stable')
+            sorted_scores = np.take_along_axis(front_scores, order, axis=0)
+            obj_range = sorted_scores[-1] - sorted_scores[0]
+            # Objectives with no spread add nothing to the interior distances
+            gaps = np.divide(sorted_scores[2:] - sorted_scores[:-2], obj_range,
+                             out=np.zeros_like(sorted_scores[2:]), where=obj_range != 0)
+            distances = np.zeros(len(front))
+            np.add.at(distances, order[1:-1], gaps)
+            distances[order[0]] = float('inf')
+            distances[order[-1]] = float('inf')
+            crowding_distances[front] = distances
+        return crowding_distances
+
+    def select_next_generation(self, fronts, crowding_distances):
+        # Indices of the survivors: whole fronts while they fit, then the least crowded of the next
         next_gen = []
         for front in fronts:
             if len(next_gen) + len(front) <= self.population_size:
-                next_gen.extend([self.population[i] for i in front])
+                next_gen.extend(front)
             else:
                 remaining = self.population_size - len(next_gen)
-                sorted_front = sorted(front, key=lambda x: self.population[x].crowding_distance, reverse=True)
-                next_gen.extend([self.population[i] for i in sorted_front[:remaining]])
+                front = np.asarray(front)
+                # Partial selection of the `remaining` largest distances; their order does not matter
+                least_crowded = np.argpartition(-crowding_distances[front], remaining)[:remaining]
+                next_gen.extend(front[least_crowded].tolist())
                 break
         return next_gen
 
     def print_generation_stats(self, generation, fitness_scores):
+        if not logger.isEnabledFor(logging.INFO):
+            return
         avg_scores = np.mean(fitness_scores, axis=0)
         best_scores = np.max(fitness_scores, axis=0)
-        print(f"Generation {generation}:")
+        logger.info("Generation %d:", generation)
         objectives = ["Structural Integrity", "Energy Efficiency", "Safety", "Livability", "Cost", "Pedestrian Flow", "Blast Resistance"]
         for i, obj in enumerate(objectives):
-            print(f"  {obj}: Avg = {avg_scores[i]:.4f}, Best = {best_scores[i]:.4f}")
+            logger.info("  %s: Avg = %.4f, Best = %.4f", obj, avg_scores[i], best_scores[i])
 
 # Example use of the NSGA-II algorithm
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     nsga_ii = NSGAII(population_size=100)
     best_genome = nsga_ii.evolve()
     print("Best Genome:", best_genome)
\ No newline at end of file
@@ -1,97 +1,130 @@
 # "src/ml_module/surrogate_model.py"
 
 ## The SurrogateModel class provides the following functionality:
-## - Training surrogate models for each objective using Random Forest Regressors.
+## - Training surrogate models for each objective using histogram-based gradient boosting.
 ## - Predicting fitness scores for new building designs.
 ## - Analysing feature importance to understand which building characteristics have the most impact on each objective.
 ## - Calculating permutation importance as a measure of feature importance.
+##   feature_importance() uses it on the held-out split, as boosted models have no impurity importances.
+
+import logging
 
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
+from joblib import Parallel, delayed, effective_n_jobs, parallel_config
+from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error
 from sklearn.preprocessing import StandardScaler
 from sklearn.inspection import permutation_importance
+from threadpoolctl import threadpool_limits
+from ..genetic_algorithm.encoding import CATEGORY_INDEX, population_as_soa
+
+# Genes used as model inputs, as (gene, field) of GENOME_DTYPE; categorical genes become their category code
+FEATURES = (
+    ('building_envelope', 'height'), ('building_envelope', 'width'), ('building_envelope', 'length'),
+    ('building_envelope', 'shape'), ('structural_system', 'material'), ('structural_system', 'frame_type'),
+    ('floor_plans', 'num_floors'), ('floor_plans', 'floor_height'), ('mep_systems', 'hvac_type'),
+    ('mep_systems', 'renewable_energy'), ('facade', 'window_ratio'),
+)
+FEATURE_NAMES = [field for _, field in FEATURES]
+
+logger = logging.getLogger(__name__)
 
 class SurrogateModel:
-    def __init__(self, n_estimators=100):
+    def __init__(self, n_estimators=100, n_jobs=-1):
         self.models = {}
-        self.scalers = {}
+        # Fitted on the training features in train() and shared by all objective models
+        self.scaler = None
+        # Held-out (X_test_scaled, y_test) with one y_test column per objective, kept for feature_importance
+        self._validation = None
         self.n_estimators = n_estimators
+        # Number of objectives fitted concurrently by train() (joblib semantics, -1 = all cores)
+        self.n_jobs = n_jobs
         self.objectives = ['structural_integrity', 'energy_efficiency', 'safety', 'livability', 'cost', 'pedestrian_flow', 'blast_resistance']
         self.is_trained = False
 
     def _genome_to_features(self, genome):
-        features = [
-            genome.genes['building_envelope'].children[0].value,  # height
-            genome.genes['building_envelope'].children[1].value,  # width
-            genome.genes['building_envelope'].children[2].value,  # length
-            ['rectangular', 'L-shaped', 'U-shaped'].index(genome.genes['building_envelope'].children[3].value),  # shape
-            ['concrete', 'steel', 'wood'].index(genome.genes['structural_system'].children[0].value),  # material
-            ['moment frame', 'braced frame', 'shear wall'].index(genome.genes['structural_system'].children[1].value),  # frame_type
-            genome.genes['floor_plans'].children[0].value,  # num_floors
-            genome.genes['floor_plans'].children[1].value,  # floor_height
-            ['central', 'distributed', 'hybrid'].index(genome.genes['mep_systems'].children[0].value),  # hvac_type
-            int(genome.genes['mep_systems'].children[3].value),  # renewable_energy
-            genome.genes['facade'].children[0].value,  # window_ratio
-        ]
-        return np.array(features).reshape(1, -1)
+        return self._genomes_to_matrix([genome])
+
+    def _genomes_to_matrix(self, genomes):
+        # One row per genome, one column per FEATURES entry
+        records = population_as_soa(genomes)
+        X = np.empty((len(genomes), len(FEATURES)))
+        for column, (key, field) in enumerate(FEATURES):
+            values = records[key][field]
+            if (key, field) in CATEGORY_INDEX:
+                index = CATEGORY_INDEX[(key, field)]
+                X[:, column] = [index[value] for value in values.tolist()]
+            else:
+                X[:, column] = values
+        return X
 
     def train(self, genomes, fitness_scores):
-        X = np.array([self._genome_to_features(genome) for genome in genomes]).reshape(len(genomes), -1)
-        
-        for i, objective in enumerate(self.objectives):
-            y = np.array([score[i] for score in fitness_scores])
-            
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-            
-            scaler = StandardScaler()
-            X_train_scaled = scaler.fit_transform(X_train)
-            X_test_scaled = scaler.transform(X_test)
-            
-            model = RandomForestRegressor(n_estimators=self.n_estimators, random_state=42)
-            model.fit(X_train_scaled, y_train)
-            
+        X = self._genomes_to_matrix(genomes)
+        fitness_scores = np.asarray(fitness_scores)
+
+        # Every objective shares the inputs, so the split and the scaler are computed once
+        X_train, X_test, y_train, y_test = train_test_split(X, fitness_scores, test_size=0.2, random_state=42)
+        self.scaler = StandardScaler()
+        X_train_scaled = self.scaler.fit_transform(X_train)
+        X_test_scaled = self.scaler.transform(X_test)
+        self._validation = (X_test_scaled, y_test)
+
+        # The objectives are independent fits; threads avoid pickling X to worker processes. Each model
+        # also uses OpenMP across all cores, so concurrent fits are limited to one OpenMP thread each.
+        single_threaded = effective_n_jobs(self.n_jobs) > 1
+        results = Parallel(n_jobs=self.n_jobs, prefer='threads')(
+            delayed(self._fit_objective)(X_train_scaled, X_test_scaled, y_train[:, i], y_test[:, i], single_threaded)
+            for i in range(len(self.objectives)))
+
+        for objective, (model, train_mse, test_mse) in zip(self.objectives, results):
             self.models[objective] = model
-            self.scalers[objective] = scaler
-            
-            train_predictions = model.predict(X_train_scaled)
-            test_predictions = model.predict(X_test_scaled)
-            
-            train_mse = mean_squared_error(y_train, train_predictions)
-            test_mse = mean_squared_error(y_test, test_predictions)
-            
-            print(f"Surrogate Model for {objective} - Train MSE: {train_mse:.4f}, Test MSE: {test_mse:.4f}")
+            logger.info("Surrogate Model for %s - Train MSE: %.4f, Test MSE: %.4f", objective, train_mse, test_mse)
         
         self.is_trained = True
 
+    def _fit_objective(self, X_train_scaled, X_test_scaled, y_train, y_test, single_threaded=False):
+        # OpenMP thread limits apply to the calling thread, so each concurrent fit sets its own
+        with threadpool_limits(limits=1 if single_threaded else None, user_api='openmp'):
+            model = self._make_model()
+            model.fit(X_train_scaled, y_train)
+
+            train_mse = mean_squared_error(y_train, model.predict(X_train_scaled))
+            test_mse = mean_squared_error(y_test, model.predict(X_test_scaled))
+        return model, train_mse, test_mse
+
+    def _make_model(self):
+        # Histogram binning makes fitting and prediction much cheaper than a random forest on this 11-feature input;
+        # n_estimators is the number of boosting iterations
+        return HistGradientBoostingRegressor(max_iter=self.n_estimators, random_state=42)
+
     def predict(self, genome):
+        return dict(zip(self.objectives, self.predict_batch([genome])[0]))
+
+    def predict_batch(self, genomes):
+        # (len(genomes), len(self.objectives)) predictions; each model predicts the whole batch in one call
         if not self.is_trained:
             raise ValueError("Surrogate model has not been trained yet.")
-        
-        features = self._genome_to_features(genome)
-        predictions = {}
-        
-        for objective in self.objectives:
-            features_scaled = self.scalers[objective].transform(features)
-            predictions[objective] = self.models[objective].predict(features_scaled)[0]
-        
+
+        X_scaled = self.scaler.transform(self._genomes_to_matrix(genomes))
+        predictions = np.empty((len(genomes), len(self.objectives)))
+        for i, objective in enumerate(self.objectives):
+            predictions[:, i] = self.models[objective].predict(X_scaled)
         return predictions
 
     def feature_importance(self):
         if not self.is_trained:
             raise ValueError("Surrogate model has not been trained yet.")
         
-        feature_names = [
-            'height', 'width', 'length', 'shape', 'material', 'frame_type',
-            'num_floors', 'floor_height', 'hvac_type', 'renewable_energy', 'window_ratio'
-        ]
-        
         importance_dict = {}
         
-        for objective in self.objectives:
-            importance = self.models[objective].feature_importances_
-            importance_dict[objective] = dict(zip(feature_names, importance))
+        X_test_scaled, y_test = self._validation
+        # The feature permutations are scored concurrently, on threads like the training fits
+        with parallel_config(prefer='threads'):
+            for i, objective in enumerate(self.objectives):
+                importance = permutation_importance(self.models[objective], X_test_scaled, y_test[:, i],
+                                                    n_repeats=5, random_state=42, n_jobs=self.n_jobs)
+                importance_dict[objective] = dict(zip(FEATURE_NAMES, importance.importances_mean))
         
         return importance_dict
 
@@ -99,17 +132,14 @@ class SurrogateModel:
         if not self.is_trained:
             raise ValueError("Surrogate model has not been trained yet.")
         
-        feature_names = [
-            'height', 'width', 'length', 'shape', 'material', 'frame_type',
-            'num_floors', 'floor_height', 'hvac_type', 'renewable_energy', 'window_ratio'
-        ]
-        
         perm_importance_dict = {}
         
-        for objective in self.objectives:
-            X_scaled = self.scalers[objective].transform(X)
-            perm_importance = permutation_importance(self.models[objective], X_scaled, y[objective], n_repeats=10, random_state=42)
-            perm_importance_dict[objective] = dict(zip(feature_names, perm_importance.importances_mean))
+        X_scaled = self.scaler.transform(X)
+        with parallel_config(prefer='threads'):
+            for objective in self.objectives:
+                perm_importance = permutation_importance(self.models[objective], X_scaled, y[objective],
+                                                         n_repeats=10, random_state=42, n_jobs=self.n_jobs)
+                perm_importance_dict[objective] = dict(zip(FEATURE_NAMES, perm_importance.importances_mean))
         
         return perm_importance_dict
 
@@ -117,6 +147,8 @@ class SurrogateModel:
 if __name__ == "__main__":
     from src.genetic_algorithm.encoding import BuildingGenome
     from src.genetic_algorithm.evolution import EvolutionaryAlgorithm
+
+    logging.basicConfig(level=logging.INFO)
     
     # Generate example data
     ea = EvolutionaryAlgorithm(population_size=100)
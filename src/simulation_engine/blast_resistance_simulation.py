@@ -10,30 +10,40 @@
 ## - Blast resistance simulation
 
 import numpy as np
-from scipy.integrate import odeint
+
+# Material and frame properties; any other value falls back to the wood / shear wall entry
+DENSITY = {'concrete': 2400, 'steel': 7850, 'wood': 500}  # kg/m^3
+ELASTIC_MODULUS = {'concrete': 30e9, 'steel': 200e9, 'wood': 11e9}  # Pa
+FRAME_FACTOR = {'moment frame': 1, 'braced frame': 1.5, 'shear wall': 2}
 
 class BlastResistanceSimulation:
+    # Blast load, simulated time window and damage thresholds shared by simulate() and simulate_batch()
+    peak_pressure = 1000  # kPa
+    positive_phase_duration = 0.02  # seconds
+    duration = 0.5  # seconds
+    time_steps = 1000
+    yield_displacement = 0.1  # Assumed yield displacement
+    ultimate_displacement = 0.5  # Assumed ultimate displacement
+
     def __init__(self, genome):
         self.genome = genome
-        self.height = genome.genes['building_envelope'].children[0].value
-        self.width = genome.genes['building_envelope'].children[1].value
-        self.length = genome.genes['building_envelope'].children[2].value
-        self.material = genome.genes['structural_system'].children[0].value
-        self.frame_type = genome.genes['structural_system'].children[1].value
+        traits = genome.traits()
+        self.height = traits.height
+        self.width = traits.width
+        self.length = traits.length
+        self.material = traits.material
+        self.frame_type = traits.frame_type
 
     def simulate(self):
-        peak_pressure = 1000  # kPa
-        positive_phase_duration = 0.02  # seconds
-
         mass = self.calculate_mass()
         stiffness = self.calculate_stiffness()
 
-        t = np.linspace(0, 0.5, 1000)
-        y0 = [0, 0]  # Initial displacement and velocity
-        sol = odeint(self.building_dynamics, y0, t, args=(mass, stiffness, peak_pressure, positive_phase_duration))
+        t = np.linspace(0, self.duration, self.time_steps)
+        peak_force = self.peak_pressure * self.width * self.length
+        displacement, velocity = self.sdof_response(t, mass, stiffness, peak_force, self.positive_phase_duration)
 
-        max_displacement = np.max(np.abs(sol[:, 0]))
-        max_velocity = np.max(np.abs(sol[:, 1]))
+        max_displacement = np.max(np.abs(displacement))
+        max_velocity = np.max(np.abs(velocity))
 
         damage_index = self.calculate_damage_index(max_displacement)
 
@@ -46,44 +56,55 @@ class BlastResistanceSimulation:
 
     def calculate_mass(self):
         volume = self.height * self.width * self.length
-        if self.material == 'concrete':
-            density = 2400  # kg/m^3
-        elif self.material == 'steel':
-            density = 7850  # kg/m^3
-        else:  # wood
-            density = 500  # kg/m^3
-        return volume * density
+        return volume * DENSITY.get(self.material, DENSITY['wood'])
 
     def calculate_stiffness(self):
-        if self.material == 'concrete':
-            elastic_modulus = 30e9  # Pa
-        elif self.material == 'steel':
-            elastic_modulus = 200e9  # Pa
-        else:  # wood
-            elastic_modulus = 11e9  # Pa
-
+        elastic_modulus = ELASTIC_MODULUS.get(self.material, ELASTIC_MODULUS['wood'])
         moment_of_inertia = (self.width * self.length**3) / 12
-        if self.frame_type == 'moment frame':
-            factor = 1
-        elif self.frame_type == 'braced frame':
-            factor = 1.5
-        else:  # shear wall
-            factor = 2
+        factor = FRAME_FACTOR.get(self.frame_type, FRAME_FACTOR['shear wall'])
 
         return factor * (3 * elastic_modulus * moment_of_inertia) / (self.height**3)
 
-    def building_dynamics(self, y, t, m, k, p0, td):
-        x, dx = y
-        if t <= td:
-            f = p0 * (1 - t/td) * self.width * self.length
-        else:
-            f = 0
-        ddx = (f - k * x) / m
-        return [dx, ddx]
+    @classmethod
+    def simulate_batch(cls, records):
+        # Blast resistance score of every genome in a GENOME_DTYPE record array, same model as simulate();
+        # each building's response is one row of a (buildings, time steps) array
+        envelope, structure = records['building_envelope'], records['structural_system']
+        height, width, length = envelope['height'], envelope['width'], envelope['length']
+        materials, frame_types = structure['material'].tolist(), structure['frame_type'].tolist()
+        density = np.array([DENSITY.get(material, DENSITY['wood']) for material in materials], dtype=float)
+        elastic_modulus = np.array([ELASTIC_MODULUS.get(material, ELASTIC_MODULUS['wood']) for material in materials])
+        factor = np.array([FRAME_FACTOR.get(frame_type, FRAME_FACTOR['shear wall']) for frame_type in frame_types], dtype=float)
+
+        mass = height * width * length * density
+        stiffness = factor * (3 * elastic_modulus * (width * length**3) / 12) / height**3
+        t = np.linspace(0, cls.duration, cls.time_steps)
+        displacement, _ = cls.sdof_response(t, mass[:, np.newaxis], stiffness[:, np.newaxis],
+                                            (cls.peak_pressure * width * length)[:, np.newaxis], cls.positive_phase_duration)
+        max_displacement = np.abs(displacement).max(axis=1)
+        damage_index = np.clip((max_displacement - cls.yield_displacement) / (cls.ultimate_displacement - cls.yield_displacement), 0, 1)
+        return 1 - damage_index
+
+    @staticmethod
+    def sdof_response(t, m, k, f0, td):
+        # Closed-form response from rest of the undamped system m x'' + k x = f(t) to the
+        # triangular pulse f0 * (1 - t/td) (Biggs, Introduction to Structural Dynamics):
+        # forced response up to td, then free vibration from the state reached at td
+        omega = np.sqrt(k / m)
+        static_displacement = f0 / k
+        t_pulse = np.minimum(t, td)
+        cos_pulse, sin_pulse = np.cos(omega * t_pulse), np.sin(omega * t_pulse)
+        x_pulse = static_displacement * (1 - cos_pulse + sin_pulse / (omega * td) - t_pulse / td)
+        v_pulse = static_displacement * (omega * sin_pulse + (cos_pulse - 1) / td)
+        t_free = t - t_pulse  # zero during the pulse
+        cos_free, sin_free = np.cos(omega * t_free), np.sin(omega * t_free)
+        displacement = x_pulse * cos_free + v_pulse / omega * sin_free
+        velocity = v_pulse * cos_free - x_pulse * omega * sin_free
+        return displacement, velocity
 
     def calculate_damage_index(self, max_displacement):
-        yield_displacement = 0.1  # Assumed yield displacement
-        ultimate_displacement = 0.5  # Assumed ultimate displacement
+        yield_displacement = self.yield_displacement
+        ultimate_displacement = self.ultimate_displacement
         if max_displacement < yield_displacement:
             return 0
         elif max_displacement > ultimate_displacement:
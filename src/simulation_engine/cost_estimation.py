@@ -7,25 +7,36 @@
 ## - Finishing costs
 ## - Total cost estimation
 
+import numpy as np
+
+from ..genetic_algorithm.encoding import category_lookup
+
+# Labour hours per m^3 by frame type and MEP cost factor by HVAC type; any other value falls back to
+# the shear wall / hybrid entry
+LABOUR_HOURS = {'moment frame': 0.5, 'braced frame': 0.4, 'shear wall': 0.3}
+HVAC_COST_FACTOR = {'central': 1.2, 'distributed': 1.0, 'hybrid': 1.1}
+
 class CostEstimation:
+    material_costs = {
+        'concrete': 100,  # £/m^3
+        'steel': 2000,    # £/ton
+        'wood': 500       # £/m^3
+    }
+    labour_cost = 50  # £/hour
+
     def __init__(self, genome):
         self.genome = genome
-        self.material_costs = {
-            'concrete': 100,  # £/m^3
-            'steel': 2000,    # £/ton
-            'wood': 500       # £/m^3
-        }
-        self.labour_cost = 50  # £/hour
 
     def estimate(self):
-        height = self.genome.genes['building_envelope'].children[0].value
-        width = self.genome.genes['building_envelope'].children[1].value
-        length = self.genome.genes['building_envelope'].children[2].value
-        material = self.genome.genes['structural_system'].children[0].value
-        frame_type = self.genome.genes['structural_system'].children[1].value
-        num_floors = self.genome.genes['floor_plans'].children[0].value
-        hvac_type = self.genome.genes['mep_systems'].children[0].value
-        renewable_energy = self.genome.genes['mep_systems'].children[3].value
+        traits = self.genome.traits()
+        height = traits.height
+        width = traits.width
+        length = traits.length
+        material = traits.material
+        frame_type = traits.frame_type
+        num_floors = traits.num_floors
+        hvac_type = traits.hvac_type
+        renewable_energy = traits.renewable_energy
 
         volume = height * width * length
         material_cost = self._estimate_material_cost(volume, material)
@@ -59,25 +70,12 @@ class CostEstimation:
             return volume * self.material_costs[material]
 
     def _estimate_labour_cost(self, volume, frame_type):
-        if frame_type == 'moment frame':
-            labour_hours = volume * 0.5
-        elif frame_type == 'braced frame':
-            labour_hours = volume * 0.4
-        else:  # shear wall
-            labour_hours = volume * 0.3
-        
+        labour_hours = volume * LABOUR_HOURS.get(frame_type, LABOUR_HOURS['shear wall'])
         return labour_hours * self.labour_cost
 
     def _estimate_mep_cost(self, volume, hvac_type, renewable_energy):
         base_cost = volume * 50  # £50 per cubic meter for MEP systems
-        
-        if hvac_type == 'central':
-            hvac_factor = 1.2
-        elif hvac_type == 'distributed':
-            hvac_factor = 1.0
-        else:  # hybrid
-            hvac_factor = 1.1
-        
+        hvac_factor = HVAC_COST_FACTOR.get(hvac_type, HVAC_COST_FACTOR['hybrid'])
         renewable_factor = 1.3 if renewable_energy else 1.0
         
         return base_cost * hvac_factor * renewable_factor
@@ -85,6 +83,30 @@ class CostEstimation:
     def _estimate_finishing_cost(self, volume):
         return volume * 100  # £100 per cubic meter for finishing
 
+    @classmethod
+    def estimate_batch(cls, records):
+        # Cost score of every genome in a GENOME_DTYPE record array, same model as estimate()
+        envelope, structure, mep = records['building_envelope'], records['structural_system'], records['mep_systems']
+        volume = envelope['height'] * envelope['width'] * envelope['length']
+
+        # Like estimate(), a material without a price is an error rather than a default
+        materials = structure['material']
+        unpriced = ~np.isin(materials, list(cls.material_costs))
+        if unpriced.any():
+            raise KeyError(materials[unpriced][0])
+        # Steel is priced per ton at 100 kg per m^3, the other materials per m^3
+        material_rate = {material: cost * (0.1 if material == 'steel' else 1) for material, cost in cls.material_costs.items()}
+        material_cost = volume * category_lookup(materials, ('structural_system', 'material'), material_rate, np.nan)
+        labour_cost = volume * category_lookup(structure['frame_type'], ('structural_system', 'frame_type'),
+                                               LABOUR_HOURS, LABOUR_HOURS['shear wall']) * cls.labour_cost
+        hvac_factor = category_lookup(mep['hvac_type'], ('mep_systems', 'hvac_type'), HVAC_COST_FACTOR, HVAC_COST_FACTOR['hybrid'])
+        mep_cost = volume * 50 * hvac_factor * np.where(mep['renewable_energy'], 1.3, 1.0)
+        finishing_cost = volume * 100
+
+        total_cost = material_cost + labour_cost + mep_cost + finishing_cost
+        cost_per_sqm = total_cost / (envelope['width'] * envelope['length'] * records['floor_plans']['num_floors'])
+        return np.clip(1 - (cost_per_sqm - 2000) / 1000, 0, 1)
+
 # Example use case
 if __name__ == "__main__":
     from ..genetic_algorithm.encoding import BuildingGenome
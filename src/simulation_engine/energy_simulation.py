@@ -7,21 +7,31 @@
 ## - Energy efficiency score calculation
 ## - CO2 emissions estimation
 
+import numpy as np
+
+from ..genetic_algorithm.encoding import category_lookup
+
+# Energy consumption multipliers per system type; any other value leaves the consumption unchanged
+HVAC_FACTOR = {'central': 0.9, 'distributed': 1.1, 'hybrid': 1.0}  # Central systems are more efficient
+LIGHTING_FACTOR = {'LED': 0.8, 'fluorescent': 1.2, 'incandescent': 1.0}
+PLUMBING_FACTOR = {'central': 0.95, 'distributed': 1.0}
+
 class EnergySimulation:
     def __init__(self, genome):
         self.genome = genome
 
     def simulate(self):
         # Extract relevant parameters from the genome
-        height = self.genome.genes['building_envelope'].children[0].value
-        width = self.genome.genes['building_envelope'].children[1].value
-        length = self.genome.genes['building_envelope'].children[2].value
-        num_floors = self.genome.genes['floor_plans'].children[0].value
-        window_ratio = self.genome.genes['facade'].children[0].value
-        hvac_type = self.genome.genes['mep_systems'].children[0].value
-        lighting_type = self.genome.genes['mep_systems'].children[1].value
-        plumbing_type = self.genome.genes['mep_systems'].children[2].value
-        renewable_energy = self.genome.genes['mep_systems'].children[3].value
+        traits = self.genome.traits()
+        height = traits.height
+        width = traits.width
+        length = traits.length
+        num_floors = traits.num_floors
+        window_ratio = traits.window_ratio
+        hvac_type = traits.hvac_type
+        lighting_type = traits.lighting_type
+        plumbing_type = traits.plumbing_type
+        renewable_energy = traits.renewable_energy
 
         # Calculate building volume and surface area
         volume = height * width * length
@@ -33,24 +43,10 @@ class EnergySimulation:
         # Adjust for window ratio (more windows = more energy loss)
         energy_consumption = base_energy_consumption * (1 + window_ratio)
 
-        # Adjust for HVAC system
-        if hvac_type == 'central':
-            energy_consumption *= 0.9  # Assume central systems are more efficient
-        elif hvac_type == 'distributed':
-            energy_consumption *= 1.1
-        # Hybrid systems don't change the base consumption
-
-        # Adjust for lighting type
-        if lighting_type == 'LED':
-            energy_consumption *= 0.8
-        elif lighting_type == 'fluorescent':
-            energy_consumption *= 1.2
-        # Incandescent lights are inefficient, so no adjustment needed
-
-        # Adjust for plumbing type
-        if plumbing_type == 'central':
-            energy_consumption *= 0.95
-        # Distributed systems are less efficient, so no adjustment needed
+        # Adjust for HVAC, lighting and plumbing types
+        energy_consumption *= HVAC_FACTOR.get(hvac_type, 1.0)
+        energy_consumption *= LIGHTING_FACTOR.get(lighting_type, 1.0)
+        energy_consumption *= PLUMBING_FACTOR.get(plumbing_type, 1.0)
 
         # Adjust for renewable energy
         if renewable_energy:
@@ -70,6 +66,18 @@ class EnergySimulation:
             'co2_emissions': co2_emissions
         }
 
+    @staticmethod
+    def simulate_batch(records):
+        # Energy efficiency of every genome in a GENOME_DTYPE record array, same model as simulate()
+        envelope, mep = records['building_envelope'], records['mep_systems']
+        volume = envelope['height'] * envelope['width'] * envelope['length']
+        energy_consumption = volume * 100 * (1 + records['facade']['window_ratio'])
+        energy_consumption *= category_lookup(mep['hvac_type'], ('mep_systems', 'hvac_type'), HVAC_FACTOR, 1.0)
+        energy_consumption *= category_lookup(mep['lighting_type'], ('mep_systems', 'lighting_type'), LIGHTING_FACTOR, 1.0)
+        energy_consumption *= category_lookup(mep['plumbing_type'], ('mep_systems', 'plumbing_type'), PLUMBING_FACTOR, 1.0)
+        energy_consumption *= np.where(mep['renewable_energy'], 0.7, 1.0)
+        return np.clip(1 - energy_consumption / (volume * 150), 0, 1)
+
 
 # Example use case
 if __name__ == "__main__":
@@ -7,27 +7,43 @@
 ## - Acoustic comfort
 ## - Air quality
 
+import numpy as np
+
+from ..genetic_algorithm.encoding import category_lookup
+
+# Scores per shape and HVAC type; any other value falls back to the U-shaped / hybrid entry
+SPATIAL_SHAPE_SCORE = {'rectangular': 0.8, 'L-shaped': 0.9, 'U-shaped': 1.0}
+LIGHT_SHAPE_SCORE = {'rectangular': 0.9, 'L-shaped': 0.8, 'U-shaped': 0.7}
+ACOUSTIC_SHAPE_SCORE = {'rectangular': 0.8, 'L-shaped': 0.9, 'U-shaped': 1.0}  # U-shape creates quieter inner spaces
+THERMAL_HVAC_SCORE = {'central': 0.9, 'distributed': 0.8, 'hybrid': 1.0}
+AIR_HVAC_SCORE = {'central': 0.8, 'distributed': 0.7, 'hybrid': 0.9}
+
 class LivabilityEvaluation:
     def __init__(self, genome):
         self.genome = genome
 
     def evaluate(self):
-        # Extract relevant parameters from the genome
-        height = self.genome.genes['building_envelope'].children[0].value
-        width = self.genome.genes['building_envelope'].children[1].value
-        length = self.genome.genes['building_envelope'].children[2].value
-        shape = self.genome.genes['building_envelope'].children[3].value
-        num_floors = self.genome.genes['floor_plans'].children[0].value
-        floor_height = self.genome.genes['floor_plans'].children[1].value
-        window_ratio = self.genome.genes['facade'].children[0].value
-        hvac_type = self.genome.genes['mep_systems'].children[0].value
-
-        # Evaluate various aspects of livability
-        spatial_quality = self._evaluate_spatial_quality(width, length, floor_height, shape)
-        natural_light = self._evaluate_natural_light(window_ratio, shape)
-        thermal_comfort = self._evaluate_thermal_comfort(hvac_type, window_ratio)
-        acoustic_comfort = self._evaluate_acoustic_comfort(num_floors, shape)
-        air_quality = self._evaluate_air_quality(hvac_type, window_ratio)
+        # Straight-line scalar form of evaluate_batch: every aspect is one expression over the traits
+        traits = self.genome.traits()
+        shape, hvac_type, window_ratio = traits.shape, traits.hvac_type, traits.window_ratio
+        area = traits.width * traits.length
+
+        # Assumption: ideal area is between 50-200 sq meters, ideal volume between 150-600 cubic meters
+        spatial_quality = (1 - min(abs(area - 125) / 75, 1)
+                           + 1 - min(abs(area * traits.floor_height - 375) / 225, 1)
+                           + SPATIAL_SHAPE_SCORE.get(shape, SPATIAL_SHAPE_SCORE['U-shaped'])) / 3
+        # Assumption: ideal window ratio is between 0.3-0.6; the shape affects light distribution
+        natural_light = (1 - min(abs(window_ratio - 0.45) / 0.15, 1)
+                         + LIGHT_SHAPE_SCORE.get(shape, LIGHT_SHAPE_SCORE['U-shaped'])) / 2
+        # Assumption: a 0.3-0.5 window ratio is ideal for thermal comfort
+        thermal_comfort = (THERMAL_HVAC_SCORE.get(hvac_type, THERMAL_HVAC_SCORE['hybrid'])
+                           + 1 - min(abs(window_ratio - 0.4) / 0.1, 1)) / 2
+        # Assumption: more floors = more noise
+        acoustic_comfort = (max(0, 1 - (traits.num_floors - 5) * 0.05)
+                            + ACOUSTIC_SHAPE_SCORE.get(shape, ACOUSTIC_SHAPE_SCORE['U-shaped'])) / 2
+        # Higher window ratio allows for better natural ventilation
+        air_quality = (AIR_HVAC_SCORE.get(hvac_type, AIR_HVAC_SCORE['hybrid'])
+                       + min(window_ratio / 0.5, 1)) / 2
 
         # Calculate overall livability score
         livability_score = (spatial_quality + natural_light + thermal_comfort + acoustic_comfort + air_quality) / 5
@@ -41,79 +57,31 @@ class LivabilityEvaluation:
             'air_quality': air_quality
         }
 
-    def _evaluate_spatial_quality(self, width, length, floor_height, shape):
-        area = width * length
-        volume = area * floor_height
-        
-        # Assumption: ideal area is between 50-200 sq meters
-        area_score = 1 - min(abs(area - 125) / 75, 1)
-         
-        # Assumption: ideal volume is between 150-600 cubic meters
-        volume_score = 1 - min(abs(volume - 375) / 225, 1)
-
-        # Shape factor
-        if shape == 'rectangular':
-            shape_score = 0.8
-        elif shape == 'L-shaped':
-            shape_score = 0.9
-        else:  # U-shaped
-            shape_score = 1.0
-
-        return (area_score + volume_score + shape_score) / 3
-
-    def _evaluate_natural_light(self, window_ratio, shape):
-        # Assumption: ideal window ratio is between 0.3-0.6
-        light_score = 1 - min(abs(window_ratio - 0.45) / 0.15, 1)
-
-        # Shape factor for light distribution
-        if shape == 'rectangular':
-            shape_score = 0.9
-        elif shape == 'L-shaped':
-            shape_score = 0.8
-        else:  # U-shaped
-            shape_score = 0.7
-
-        return (light_score + shape_score) / 2
-
-    def _evaluate_thermal_comfort(self, hvac_type, window_ratio):
-        if hvac_type == 'central':
-            hvac_score = 0.9
-        elif hvac_type == 'distributed':
-            hvac_score = 0.8
-        else:  # hybrid
-            hvac_score = 1.0
-
-        # Window ratio affects thermal comfort
-        # Assumption: 0.3-0.5 is ideal
-        window_score = 1 - min(abs(window_ratio - 0.4) / 0.1, 1)
-
-        return (hvac_score + window_score) / 2
-
-    def _evaluate_acoustic_comfort(self, num_floors, shape):
-        # Assumption: more floors = more noise
-        floor_factor = max(0, 1 - (num_floors - 5) * 0.05)
-
-        if shape == 'rectangular':
-            shape_score = 0.8
-        elif shape == 'L-shaped':
-            shape_score = 0.9
-        else:  # U-shaped
-            shape_score = 1.0  # U-shape creates quieter inner spaces
-
-        return (floor_factor + shape_score) / 2
-
-    def _evaluate_air_quality(self, hvac_type, window_ratio):
-        if hvac_type == 'central':
-            hvac_score = 0.8
-        elif hvac_type == 'distributed':
-            hvac_score = 0.7
-        else:  # hybrid
-            hvac_score = 0.9
-
-        # Higher window ratio allows for better natural ventilation
-        window_score = min(window_ratio / 0.5, 1)
-
-        return (hvac_score + window_score) / 2
+    @staticmethod
+    def evaluate_batch(records):
+        # Livability score of every genome in a GENOME_DTYPE record array, same model as evaluate()
+        envelope, floors = records['building_envelope'], records['floor_plans']
+        window_ratio = records['facade']['window_ratio']
+
+        def shape_score(table):
+            return category_lookup(envelope['shape'], ('building_envelope', 'shape'), table, table['U-shaped'])
+
+        def hvac_score(table):
+            return category_lookup(records['mep_systems']['hvac_type'], ('mep_systems', 'hvac_type'), table, table['hybrid'])
+
+        area = envelope['width'] * envelope['length']
+        spatial_quality = (1 - np.minimum(np.abs(area - 125) / 75, 1)
+                           + 1 - np.minimum(np.abs(area * floors['floor_height'] - 375) / 225, 1)
+                           + shape_score(SPATIAL_SHAPE_SCORE)) / 3
+        natural_light = (1 - np.minimum(np.abs(window_ratio - 0.45) / 0.15, 1)
+                         + shape_score(LIGHT_SHAPE_SCORE)) / 2
+        thermal_comfort = (hvac_score(THERMAL_HVAC_SCORE)
+                           + 1 - np.minimum(np.abs(window_ratio - 0.4) / 0.1, 1)) / 2
+        acoustic_comfort = (np.maximum(0, 1 - (floors['num_floors'] - 5) * 0.05)
+                            + shape_score(ACOUSTIC_SHAPE_SCORE)) / 2
+        air_quality = (hvac_score(AIR_HVAC_SCORE)
+                       + np.minimum(window_ratio / 0.5, 1)) / 2
+        return (spatial_quality + natural_light + thermal_comfort + acoustic_comfort + air_quality) / 5
 
 
 # Example use case
@@ -12,56 +12,81 @@
 ## - Calculation of evacuation efficiency
 
 import numpy as np
+from scipy.spatial import cKDTree
 
 class PedestrianFlowSimulation:
-    def __init__(self, genome):
+    # Model constants, shared by every simulation; assign on an instance to override them for one run
+    num_pedestrians = 80  # Increase to 200 for high-occupancy scenarios
+    time_steps = 800  # Increase to 2000 for longer simulation time
+    desired_speed = 1.4  # m/s, average walking speed
+    max_force = 5.0  # Maximum force applied to pedestrians
+    relaxation_time = 0.5  # Time for pedestrians to adjust their velocity
+    panic_factor = 1.5  # Increased movement speed during emergencies
+    exit_threshold = 1.0  # Distance to an exit at which a pedestrian has left the floor
+    # Repulsion decays as exp(-d/0.3) between pedestrians and exp(-d/0.5) from obstacles;
+    # pairs further apart than ~6 decay lengths contribute nothing measurable and are skipped
+    interaction_radius = 2.0
+    obstacle_radius = 3.0
+    # Positions and speeds are O(1-100) m and m/s over at most time_steps updates, well within single precision
+    dtype = np.float32
+
+    def __init__(self, genome, seed=None):
         self.genome = genome
-        self.width = genome.genes['building_envelope'].children[1].value
-        self.length = genome.genes['building_envelope'].children[2].value
-        self.num_floors = round(genome.genes['floor_plans'].children[0].value)
-        self.num_pedestrians = 80  # Increase to 200 for high-occupancy scenarios
-        self.time_steps = 800  # Increase to 2000 for longer simulation time
-        self.desired_speed = 1.4  # m/s, average walking speed
-        self.max_force = 5.0  # Maximum force applied to pedestrians
-        self.relaxation_time = 0.5  # Time for pedestrians to adjust their velocity
-        self.panic_factor = 1.5  # Increased movement speed during emergencies
+        # Start positions, exits and obstacles are drawn from this Generator; a fixed seed reproduces a run
+        self.rng = np.random.default_rng(seed)
+        traits = genome.traits()
+        self.width = traits.width
+        self.length = traits.length
+        self.num_floors = round(traits.num_floors)
 
     def simulate(self):
+        # All floors evacuate independently, so they are stepped together as one (floors, pedestrians, 2) batch.
+        # A pedestrian who reaches an exit leaves the floor: it stops moving and no longer interacts or counts
+        # towards congestion. A floor drops out of the batch once all of its pedestrians have left
+        positions, velocities = self.initialise_pedestrians(self.num_floors)
+        exit_positions = self.generate_exits(self.num_floors)
+        obstacles = self.generate_obstacles(self.num_floors)
+        evacuation_times = np.full(self.num_floors, self.time_steps)
+        active = np.arange(self.num_floors)
+        # Obstacles never move, and the neighbour tree and nearest exits found for a step's congestion and
+        # exit check are the next step's force inputs, so each step searches neighbours and exits once
+        nearest_exits = self.find_nearest_exits(positions, exit_positions)
+        inside = nearest_exits[1] >= self.exit_threshold
+        obstacle_tree = self._floor_tree(obstacles)
+        pedestrian_tree = self._floor_tree(positions, inside)
+        # Forces are written into one buffer for the whole run; velocities and positions are updated in place
+        force_buffer = np.empty_like(positions)
+
         total_congestion = 0
-        total_evacuation_time = 0
-        for floor in range(self.num_floors):
-            positions, velocities = self.initialise_pedestrians()
-            exit_positions = self.generate_exits()
-            obstacles = self.generate_obstacles()
-            
-            # print(f"Initial positions shape: {positions.shape}")
-            # print(f"Exit positions shape: {exit_positions.shape}")
-            # print(f"Number of obstacles: {len(obstacles)}")
-            
-            evacuation_time = 0
-            for step in range(self.time_steps):
-                forces = self.calculate_forces(positions, velocities, exit_positions, obstacles)
-                velocities = self.update_velocities(velocities, forces)
-                positions = self.update_positions(positions, velocities, obstacles)
-                
-                congestion = self.calculate_congestion(positions)
-                total_congestion += congestion
-                
-                if self.all_pedestrians_exited(positions, exit_positions):
-                    evacuation_time = step + 1
-                    # print(f"  All pedestrians exited at step {evacuation_time}")
+        for step in range(self.time_steps):
+            forces = self.calculate_forces(positions, velocities, exit_positions, obstacles, pedestrian_tree, obstacle_tree,
+                                           nearest_exits, out=force_buffer[:len(active)])
+            forces *= inside[..., np.newaxis]
+            self.update_velocities(velocities, forces, out=velocities)
+            self.update_positions(positions, velocities, obstacles, out=positions)
+
+            nearest_exits = self.find_nearest_exits(positions, exit_positions)
+            inside &= nearest_exits[1] >= self.exit_threshold
+            velocities *= inside[..., np.newaxis]
+
+            pedestrian_tree = self._floor_tree(positions, inside)
+            total_congestion += self.calculate_congestion(positions, pedestrian_tree).sum()
+
+            exited = ~inside.any(axis=-1)
+            if exited.any():
+                evacuation_times[active[exited]] = step + 1
+                remaining = ~exited
+                active = active[remaining]
+                if not active.size:
                     break
-            
-            if evacuation_time == 0:
-                evacuation_time = self.time_steps
-                # print(f"  Not all pedestrians exited within the time limit.")
-            
-            total_evacuation_time += evacuation_time
-            # print(f"Floor {floor + 1} evacuation time: {evacuation_time}")
-
-      
+                positions, velocities, inside = positions[remaining], velocities[remaining], inside[remaining]
+                exit_positions, obstacles = exit_positions[remaining], obstacles[remaining]
+                nearest_exits = tuple(values[remaining] for values in nearest_exits)
+                obstacle_tree = self._floor_tree(obstacles)
+                pedestrian_tree = self._floor_tree(positions, inside)
+
         avg_congestion = total_congestion / (self.num_floors * self.time_steps)
-        avg_evacuation_time = total_evacuation_time / self.num_floors
+        avg_evacuation_time = evacuation_times.sum() / self.num_floors
 
         evacuation_efficiency = self.calculate_evacuation_efficiency(avg_evacuation_time)
          
@@ -71,86 +96,135 @@ class PedestrianFlowSimulation:
             "evacuation_efficiency": evacuation_efficiency
         }
 
-    def initialise_pedestrians(self):
-        positions = np.random.rand(self.num_pedestrians, 2) * [self.width, self.length]
-        velocities = np.zeros((self.num_pedestrians, 2))
-        # print(f"Initialised {self.num_pedestrians} pedestrians")
+    # The methods below work on (..., pedestrians, 2) arrays: a single floor or a (floors, pedestrians, 2) batch
+
+    def initialise_pedestrians(self, num_floors=1):
+        positions = self._scatter(num_floors, self.num_pedestrians)
+        velocities = np.zeros((num_floors, self.num_pedestrians, 2), dtype=self.dtype)
         return positions, velocities
 
-    def generate_exits(self):
+    def generate_exits(self, num_floors=1):
         num_exits = max(2, int(np.sqrt(self.width * self.length) / 8))
-        exits = np.random.rand(num_exits, 2) * [self.width, self.length]
-        # print(f"Generated {num_exits} exits at positions:")
-        # for i, exit_pos in enumerate(exits):
-            # print(f"  Exit {i+1}: ({exit_pos[0]:.2f}, {exit_pos[1]:.2f})")
+        exits = self._scatter(num_floors, num_exits)
         return exits
 
-    def generate_obstacles(self):
+    def generate_obstacles(self, num_floors=1):
         num_obstacles = int(np.sqrt(self.width * self.length) / 5)
-        obstacles = np.random.rand(num_obstacles, 2) * [self.width, self.length]
+        obstacles = self._scatter(num_floors, num_obstacles)
         return obstacles
 
-    def calculate_forces(self, positions, velocities, exit_positions, obstacles):
-        forces = np.zeros_like(positions)
+    def _scatter(self, num_floors, count):
+        # Uniformly random points over each floor's footprint, in the simulation dtype
+        return self.rng.random((num_floors, count, 2), dtype=self.dtype) * np.array([self.width, self.length], dtype=self.dtype)
+
+    def calculate_forces(self, positions, velocities, exit_positions, obstacles, pedestrian_tree=None, obstacle_tree=None,
+                         nearest_exits=None, out=None):
+        # The trees and nearest exits, when given, must have been computed from these positions and obstacles;
+        # a pedestrian tree built over a subset of pedestrians restricts the repulsion to that subset.
+        # out, when given, is a positions-shaped array the forces are written into
+        forces = np.empty_like(positions) if out is None else out
         
         # Desired force towards nearest exit
-        distances_to_exits = np.linalg.norm(positions[:, np.newaxis] - exit_positions, axis=2)
-        nearest_exit_indices = np.argmin(distances_to_exits, axis=1)
-        desired_directions = exit_positions[nearest_exit_indices] - positions
-        norms = np.linalg.norm(desired_directions, axis=1)
-        norms[norms == 0] = 1e-6
-        desired_directions /= norms[:, np.newaxis]
-        desired_velocities = desired_directions * self.desired_speed * self.panic_factor
-        forces += (desired_velocities - velocities) / self.relaxation_time
-
-        # Repulsive force from other pedestrians (vectorized)
-        diff = positions[:, np.newaxis] - positions
-        dist = np.linalg.norm(diff, axis=2)
-        np.fill_diagonal(dist, 1e-6)  # Avoid self-interaction
-        repulsive_force = np.exp(-dist/0.3)[:, :, np.newaxis] * diff / dist[:, :, np.newaxis]
-        forces -= repulsive_force.sum(axis=1)
-
-        # Repulsive force from obstacles
-        obstacle_diff = positions[:, np.newaxis] - obstacles
-        obstacle_dist = np.linalg.norm(obstacle_diff, axis=2)
-        obstacle_dist[obstacle_dist == 0] = 1e-6
-        obstacle_force = np.exp(-obstacle_dist/0.5)[:, :, np.newaxis] * obstacle_diff / obstacle_dist[:, :, np.newaxis]
-        forces -= obstacle_force.sum(axis=1)
-
-        # Limit max force
-        force_magnitudes = np.linalg.norm(forces, axis=1)
-        excessive_forces = force_magnitudes > self.max_force
-        forces[excessive_forces] *= self.max_force / force_magnitudes[excessive_forces, np.newaxis]
+        if nearest_exits is None:
+            nearest_exits = self.find_nearest_exits(positions, exit_positions)
+        nearest_exit_indices, norms = nearest_exits
+        desired_directions = np.take_along_axis(exit_positions, nearest_exit_indices[..., np.newaxis], axis=-2) - positions
+        desired_directions /= np.maximum(norms, 1e-6)[..., np.newaxis]
+        desired_velocities = desired_directions * (self.desired_speed * self.panic_factor)
+        np.subtract(desired_velocities, velocities, out=forces)
+        forces /= self.relaxation_time
+
+        # Repulsive force from other pedestrians, over the pairs within interaction_radius only
+        if pedestrian_tree is None:
+            pedestrian_tree = self._floor_tree(positions)
+        tree, index = pedestrian_tree
+        i, j = index[tree.query_pairs(self.interaction_radius, output_type='ndarray').T]
+        flat_positions = positions.reshape(-1, 2)
+        diff = flat_positions[i] - flat_positions[j]
+        dist = np.maximum(np.hypot(diff[:, 0], diff[:, 1]), 1e-6)
+        pair_forces = (np.exp(-dist/0.3) / dist)[:, np.newaxis] * diff
+        forces -= self._accumulate(i, pair_forces, positions.shape) - self._accumulate(j, pair_forces, positions.shape)
+
+        # Repulsive force from obstacles within obstacle_radius
+        if obstacles.shape[-2]:
+            if obstacle_tree is None:
+                obstacle_tree = self._floor_tree(obstacles)
+            pairs = tree.sparse_distance_matrix(obstacle_tree[0], self.obstacle_radius, output_type='ndarray')
+            i, j = index[pairs['i']], obstacle_tree[1][pairs['j']]
+            obstacle_diff = flat_positions[i] - obstacles.reshape(-1, 2)[j]
+            # The tree reports float64 distances; the kernel is evaluated in the simulation dtype like the pedestrian one
+            obstacle_dist = np.maximum(pairs['v'].astype(positions.dtype), 1e-6)
+            obstacle_forces = (np.exp(-obstacle_dist/0.5) / obstacle_dist)[:, np.newaxis] * obstacle_diff
+            forces -= self._accumulate(i, obstacle_forces, positions.shape)
+
+        # Limit max force: forces above max_force are scaled down to it, the rest are scaled by 1
+        force_magnitudes = np.sqrt(np.einsum('...k,...k->...', forces, forces))
+        forces *= (self.max_force / np.maximum(force_magnitudes, self.max_force))[..., np.newaxis]
 
         return forces
 
-    def update_velocities(self, velocities, forces):
-        return velocities + forces * self.relaxation_time
-
-    def update_positions(self, positions, velocities, obstacles):
+    def _floor_tree(self, points, include=None):
+        # Returns a KD-tree over the points (optionally only where include is set) and the flat index of each tree point.
+        # Floors are stacked along a third axis, further apart than any query radius, so one tree serves the whole batch
+        spacing = 2.0 * max(self.interaction_radius, self.obstacle_radius)
+        count = points.shape[-2]
+        points = points.reshape(-1, 2)
+        index = np.arange(len(points)) if include is None else np.flatnonzero(include)
+        return cKDTree(np.column_stack([points[index], index // count * spacing])), index
+
+    @staticmethod
+    def _accumulate(index, values, shape):
+        # Sum per-pair vectors onto the flattened pedestrian they act on
+        size = int(np.prod(shape[:-1]))
+        summed = [np.bincount(index, weights=values[:, axis], minlength=size) for axis in range(2)]
+        return np.stack(summed, axis=-1).reshape(shape)
+
+    def update_velocities(self, velocities, forces, out=None):
+        # out may be velocities itself to update them in place
+        return np.add(velocities, forces * self.relaxation_time, out=out)
+
+    def update_positions(self, positions, velocities, obstacles, out=None):
+        # out may be positions itself to update them in place
         new_positions = positions + velocities * self.relaxation_time
         # Ensure pedestrians stay within the building and don't overlap with obstacles
-        new_positions = np.clip(new_positions, [0, 0], [self.width, self.length])
-        for obstacle in obstacles:
-            dist_to_obstacle = np.linalg.norm(new_positions - obstacle, axis=1)
-            too_close = dist_to_obstacle < 0.5
-            new_positions[too_close] = positions[too_close]
-        return new_positions
-
-    def calculate_congestion(self, positions):
-        distances = np.linalg.norm(positions[:, np.newaxis] - positions, axis=2)
-        close_pedestrians = (distances < 0.5).sum() - self.num_pedestrians  # Reduced distance threshold
-        return close_pedestrians / self.num_pedestrians
-
-    def all_pedestrians_exited(self, positions, exit_positions):
-        distances_to_exits = np.linalg.norm(positions[:, np.newaxis] - exit_positions, axis=2)
-        min_distances = np.min(distances_to_exits, axis=1)
-        exit_threshold = 1.0  # Increased from 0.5 to 1.0 meter
-        all_exited = np.all(min_distances < exit_threshold)
+        np.clip(new_positions, 0, np.array([self.width, self.length], dtype=positions.dtype), out=new_positions)
+        # One broadcast over (..., pedestrians, obstacles), compared as squared distances to skip the sqrt
+        offsets = new_positions[..., :, np.newaxis, :] - obstacles[..., np.newaxis, :, :]
+        too_close = (np.einsum('...k,...k->...', offsets, offsets) < 0.5**2).any(axis=-1)
+        if out is None:
+            return np.where(too_close[..., np.newaxis], positions, new_positions)
+        if out is not positions:
+            np.copyto(out, positions)
+        np.copyto(out, new_positions, where=~too_close[..., np.newaxis])
+        return out
+
+    def calculate_congestion(self, positions, pedestrian_tree=None):
+        # Ordered pairs of distinct pedestrians closer than 0.5 m (reduced distance threshold), per floor
+        if pedestrian_tree is None:
+            pedestrian_tree = self._floor_tree(positions)
+        tree, index = pedestrian_tree
+        pairs = tree.query_pairs(0.5, output_type='ndarray')
+        floors = int(np.prod(positions.shape[:-2]))
+        close_pedestrians = 2 * np.bincount(index[pairs[:, 0]] // positions.shape[-2], minlength=floors)
+        return close_pedestrians.reshape(positions.shape[:-2]) / self.num_pedestrians
+
+    def find_nearest_exits(self, positions, exit_positions):
+        # Index of and distance to each pedestrian's nearest exit
+        # The nearest exit is chosen on squared distances; only the chosen distance needs a sqrt
+        offsets = positions[..., :, np.newaxis, :] - exit_positions[..., np.newaxis, :, :]
+        squared_distances = np.einsum('...k,...k->...', offsets, offsets)
+        nearest_exit_indices = np.argmin(squared_distances, axis=-1)
+        return nearest_exit_indices, np.sqrt(np.take_along_axis(squared_distances, nearest_exit_indices[..., np.newaxis], axis=-1)[..., 0])
+
+    def all_pedestrians_exited(self, positions, exit_positions, nearest_exits=None):
+        if nearest_exits is None:
+            nearest_exits = self.find_nearest_exits(positions, exit_positions)
+        min_distances = nearest_exits[1]
+        all_exited = np.all(min_distances < self.exit_threshold, axis=-1)
         return all_exited
 
     def calculate_evacuation_efficiency(self, avg_evacuation_time):
-        ideal_time = np.sqrt(self.width**2 + self.length**2) / self.desired_speed
+        ideal_time = np.hypot(self.width, self.length) / self.desired_speed
         if avg_evacuation_time == 0:
             return 1.0  # Perfect efficiency if evacuation is instantaneous
         # Cap efficiency at 1.0 to avoid negative values
@@ -10,12 +10,28 @@
 ## - Flood safety
 ## - Wind safety
 
+import hashlib
+import logging
+
 import numpy as np
-import traceback
+
+from ..genetic_algorithm.encoding import category_lookup
+
+logger = logging.getLogger(__name__)
+
+# Scores per category; any other value falls back to the wood / shear wall / U-shaped entry
+FIRE_MATERIAL_SCORE = {'concrete': 0.8, 'steel': 0.7, 'wood': 0.5}
+STRUCTURAL_MATERIAL_SCORE = {'concrete': 0.8, 'steel': 0.9, 'wood': 0.6}
+STRUCTURAL_FRAME_FACTOR = {'moment frame': 0.9, 'braced frame': 1.0, 'shear wall': 1.1}
+EARTHQUAKE_FRAME_SCORE = {'moment frame': 0.7, 'braced frame': 0.8, 'shear wall': 0.9}
+WIND_SHAPE_SCORE = {'rectangular': 0.7, 'L-shaped': 0.8, 'U-shaped': 0.9}
 
 class SafetyAssessment:
     def __init__(self, genome):
         self.genome = genome
+        # Leaf gene values, read once for all the assess_* methods
+        self.traits = genome.traits()
+        self._hazard_draw, self._security_draw = _genome_uniforms(genome.as_soa())[0]
 
     def assess(self):
         try:
@@ -51,21 +67,16 @@ class SafetyAssessment:
                 "wind_safety": wind_safety
             }
         except Exception as e:
-            print(f"Error in SafetyAssessment: {str(e)}")
-            print(traceback.format_exc())
+            # The traceback is only formatted when debug logging is on
+            logger.error("Error in SafetyAssessment: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
             return {"overall_safety": 0}  # Return a zero safety score if assessment fails
 
 
     def assess_fire_safety(self):
-        material = self.genome.genes['structural_system'].children[0].value
-        num_floors = self.genome.genes['floor_plans'].children[0].value
+        material = self.traits.material
+        num_floors = self.traits.num_floors
         
-        if material == 'concrete':
-            base_score = 0.8
-        elif material == 'steel':
-            base_score = 0.7
-        else:  # wood
-            base_score = 0.5
+        base_score = FIRE_MATERIAL_SCORE.get(material, FIRE_MATERIAL_SCORE['wood'])
 
         # Adjust for number of floors, more floors = harder to evacuate
         floor_factor = max(0, 1 - (num_floors - 5) * 0.02)
@@ -73,23 +84,12 @@ class SafetyAssessment:
         return base_score * floor_factor
 
     def assess_structural_safety(self):
-        height = self.genome.genes['building_envelope'].children[0].value
-        material = self.genome.genes['structural_system'].children[0].value
-        frame_type = self.genome.genes['structural_system'].children[1].value
+        height = self.traits.height
+        material = self.traits.material
+        frame_type = self.traits.frame_type
        
-        if material == 'concrete':
-            base_score = 0.8
-        elif material == 'steel':
-            base_score = 0.9
-        else:  # wood
-            base_score = 0.6
-
-        if frame_type == 'moment frame':
-            frame_factor = 0.9
-        elif frame_type == 'braced frame':
-            frame_factor = 1.0
-        else:  # shear wall
-            frame_factor = 1.1
+        base_score = STRUCTURAL_MATERIAL_SCORE.get(material, STRUCTURAL_MATERIAL_SCORE['wood'])
+        frame_factor = STRUCTURAL_FRAME_FACTOR.get(frame_type, STRUCTURAL_FRAME_FACTOR['shear wall'])
         
         # Adjust for height, taller buildings = more vulnerable
         height_factor = max(0, 1 - (height - 20) * 0.005)
@@ -97,9 +97,9 @@ class SafetyAssessment:
         return base_score * frame_factor * height_factor
 
     def assess_emergency_exit_safety(self):
-        num_floors = self.genome.genes['floor_plans'].children[0].value
-        length = self.genome.genes['building_envelope'].children[2].value
-        width = self.genome.genes['building_envelope'].children[1].value
+        num_floors = self.traits.num_floors
+        length = self.traits.length
+        width = self.traits.width
       
         area = width * length
         num_exits = max(2, int(np.sqrt(area) / 10))  # Assumption: 1 exit per 100 m^2, min = 2
@@ -109,23 +109,18 @@ class SafetyAssessment:
         return exit_factor
 
     def assess_hazardous_material_safety(self):
-        # TODO: assume generally good hazardous material practices
-        return np.random.uniform(0.7, 1.0)
+        # TODO: assume generally good hazardous material practices, varying per design
+        return 0.7 + 0.3 * self._hazard_draw
 
     def assess_security_measures(self):
         # TODO: assume varying levels of security measures
-        return np.random.uniform(0.6, 1.0)
+        return 0.6 + 0.4 * self._security_draw
 
     def assess_earthquake_safety(self):
-        frame_type = self.genome.genes['structural_system'].children[1].value
-        height = self.genome.genes['building_envelope'].children[0].value
+        frame_type = self.traits.frame_type
+        height = self.traits.height
 
-        if frame_type == 'moment frame':
-            base_score = 0.7
-        elif frame_type == 'braced frame':
-            base_score = 0.8
-        else:  # shear wall
-            base_score = 0.9
+        base_score = EARTHQUAKE_FRAME_SCORE.get(frame_type, EARTHQUAKE_FRAME_SCORE['shear wall'])
 
         # Adjust for height, taller buildings = more vulnerable
         height_factor = max(0, 1 - (height - 20) * 0.005)
@@ -133,26 +128,55 @@ class SafetyAssessment:
         return base_score * height_factor
 
     def assess_flood_safety(self):
-        height = self.genome.genes['building_envelope'].children[0].value
+        height = self.traits.height
         # Assumption: 20m is maximum flood height
         return min(1, height / 20)
 
     def assess_wind_safety(self):
-        height = self.genome.genes['building_envelope'].children[0].value
-        shape = self.genome.genes['building_envelope'].children[3].value
+        height = self.traits.height
+        shape = self.traits.shape
 
-        if shape == 'rectangular':
-            base_score = 0.7
-        elif shape == 'L-shaped':
-            base_score = 0.8
-        else:  # U-shaped
-            base_score = 0.9
+        base_score = WIND_SHAPE_SCORE.get(shape, WIND_SHAPE_SCORE['U-shaped'])
 
         # Adjust for height, taller buildings = more exposed to wind
         height_factor = max(0, 1 - (height - 50) * 0.005)
         
         return base_score * height_factor
 
+    @staticmethod
+    def assess_batch(records):
+        # Overall safety of every genome in a GENOME_DTYPE record array, same model as assess()
+        envelope, structure = records['building_envelope'], records['structural_system']
+        height, material, frame_type = envelope['height'], structure['material'], structure['frame_type']
+        num_floors = records['floor_plans']['num_floors']
+        height_factor = np.maximum(0, 1 - (height - 20) * 0.005)
+
+        fire_safety = _lookup(FIRE_MATERIAL_SCORE, material, 'material', 'wood') * np.maximum(0, 1 - (num_floors - 5) * 0.02)
+        structural_safety = (_lookup(STRUCTURAL_MATERIAL_SCORE, material, 'material', 'wood')
+                             * _lookup(STRUCTURAL_FRAME_FACTOR, frame_type, 'frame_type', 'shear wall') * height_factor)
+        num_exits = np.maximum(2, (np.sqrt(envelope['width'] * envelope['length']) / 10).astype(int))
+        emergency_exit_safety = np.minimum(1, num_exits / (num_floors / 2))
+        draws = _genome_uniforms(records)
+        hazardous_material_safety = 0.7 + 0.3 * draws[:, 0]
+        security_measures = 0.6 + 0.4 * draws[:, 1]
+        earthquake_safety = _lookup(EARTHQUAKE_FRAME_SCORE, frame_type, 'frame_type', 'shear wall') * height_factor
+        flood_safety = np.minimum(1, height / 20)
+        wind_safety = (category_lookup(envelope['shape'], ('building_envelope', 'shape'), WIND_SHAPE_SCORE, WIND_SHAPE_SCORE['U-shaped'])
+                       * np.maximum(0, 1 - (height - 50) * 0.005))
+
+        return (fire_safety * 0.3 + structural_safety * 0.3 + emergency_exit_safety * 0.1 + hazardous_material_safety * 0.1
+                + (security_measures + earthquake_safety + flood_safety + wind_safety) * 0.05)
+
+def _genome_uniforms(records):
+    # Two numbers in [0, 1) per GENOME_DTYPE record, taken from a hash of its gene values: they vary
+    # between designs like random draws, but a design always gets the same ones
+    digests = b''.join(hashlib.blake2b(record.tobytes(), digest_size=16).digest() for record in np.atleast_1d(records))
+    return np.frombuffer(digests, dtype='<u8').reshape(-1, 2) / 2.0**64
+
+def _lookup(table, labels, field, default):
+    # Table value for each structural_system label, with unknown labels mapped to table[default]
+    return category_lookup(labels, ('structural_system', field), table, table[default])
+
 # Example use case
 if __name__ == "__main__":
     from ..genetic_algorithm.encoding import BuildingGenome
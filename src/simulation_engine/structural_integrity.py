@@ -7,145 +7,113 @@
 ## - Seismic performance
 ## - Wind resistance
 
+import functools
+from bisect import bisect_left
+
+import numpy as np
+
+from ..genetic_algorithm.encoding import CATEGORIES, category_codes
+
+# Material and frame properties; any other value falls back to the wood / shear wall entry
+MATERIAL_FACTOR = {'concrete': 1.0, 'steel': 1.1, 'wood': 0.8}
+FRAME_FACTOR = {'moment frame': 0.9, 'braced frame': 1.0, 'shear wall': 1.1}
+SEISMIC_FRAME_SCORE = {'moment frame': 0.7, 'braced frame': 0.8, 'shear wall': 0.9}
+DENSITY = {'concrete': 2400, 'steel': 7850, 'wood': 500}  # kg/m^3
+STRENGTH = {'concrete': 30e6, 'steel': 250e6, 'wood': 20e6}  # Pa
+BASE_PRESSURE = {'concrete': 300e3, 'steel': 250e3, 'wood': 150e3}  # Pa
+
+# Lateral and wind base scores by aspect-ratio tier: up to 3, up to 5, above 5
+ASPECT_RATIO_TIERS = (3, 5)
+LATERAL_BASE_SCORE = (0.9, 0.7, 0.5)
+WIND_BASE_SCORE = (1.0, 0.8, 0.6)
+
 class StructuralIntegrity:
     def __init__(self, genome):
         self.genome = genome
 
     def analyse(self):
         # Extract relevant parameters from the genome
-        height = self.genome.genes['building_envelope'].children[0].value
-        width = self.genome.genes['building_envelope'].children[1].value
-        length = self.genome.genes['building_envelope'].children[2].value
-        material = self.genome.genes['structural_system'].children[0].value
-        frame_type = self.genome.genes['structural_system'].children[1].value
-
-        # Perform detailed structural analysis
-        lateral_stability = self.assess_lateral_stability(height, width, length, material, frame_type)
-        vertical_load_capacity = self.assess_vertical_load_capacity(height, width, length, material)
-        foundation_stability = self.assess_foundation_stability(width, length, material)
-        seismic_performance = self.assess_seismic_performance(height, material, frame_type)
-        wind_resistance = self.assess_wind_resistance(height, width, length, material, frame_type)
-
-        # Calculate overall structural integrity
-        overall_integrity = (
-            lateral_stability * 0.25 +
-            vertical_load_capacity * 0.25 +
-            foundation_stability * 0.2 +
-            seismic_performance * 0.15 +
-            wind_resistance * 0.15
-        )
-
-        return {
-            "overall_integrity": overall_integrity,
-            "lateral_stability": lateral_stability,
-            "vertical_load_capacity": vertical_load_capacity,
-            "foundation_stability": foundation_stability,
-            "seismic_performance": seismic_performance,
-            "wind_resistance": wind_resistance
-        }
-
-    def assess_lateral_stability(self, height, width, length, material, frame_type):
-        aspect_ratio = height / min(width, length)
-        if aspect_ratio > 5:
-            base_score = 0.5
-        elif aspect_ratio > 3:
-            base_score = 0.7
-        else:
-            base_score = 0.9
-
-        if frame_type == 'moment frame':
-            frame_factor = 0.9
-        elif frame_type == 'braced frame':
-            frame_factor = 1.0
-        else:  # shear wall
-            frame_factor = 1.1
-
-        if material == 'steel':
-            material_factor = 1.1
-        elif material == 'concrete':
-            material_factor = 1.0
-        else:  # wood
-            material_factor = 0.8
-
-        return base_score * frame_factor * material_factor
-
-    def assess_vertical_load_capacity(self, height, width, length, material):
-        volume = height * width * length
-        if material == 'concrete':
-            density = 2400  # kg/m^3
-            strength = 30e6  # Pa
-        elif material == 'steel':
-            density = 7850  # kg/m^3
-            strength = 250e6  # Pa
-        else:  # wood
-            density = 500  # kg/m^3
-            strength = 20e6  # Pa
-
-        mass = volume * density
-        load_capacity = strength * width * length
-        safety_factor = load_capacity / (mass * 9.81)
-
-        return min(1, safety_factor / 3)  # Assumption: ideal safety factor = 3
-
-    def assess_foundation_stability(self, width, length, material):
-        area = width * length
-        if material == 'concrete':
-            base_pressure = 300e3  # Pa
-        elif material == 'steel':
-            base_pressure = 250e3  # Pa
-        else:  # wood
-            base_pressure = 150e3  # Pa
-
-        foundation_capacity = area * base_pressure
-        estimated_building_weight = area * 5000  # Rough estimate: 5000 N/m^2
-
-        safety_factor = foundation_capacity / estimated_building_weight
-        return min(1, safety_factor / 2)  # Assumption: ideal safety factor of 2
-
-    def assess_seismic_performance(self, height, material, frame_type):
-        if frame_type == 'moment frame':
-            base_score = 0.7
-        elif frame_type == 'braced frame':
-            base_score = 0.8
-        else:  # shear wall
-            base_score = 0.9
-
-        if material == 'steel':
-            material_factor = 1.1
-        elif material == 'concrete':
-            material_factor = 1.0
-        else:  # wood
-            material_factor = 0.8
-
-        height_factor = max(0, 1 - (height - 20) * 0.005)
-
-        return base_score * material_factor * height_factor
-
-    def assess_wind_resistance(self, height, width, length, material, frame_type):
-        aspect_ratio = height / min(width, length)
-        if aspect_ratio > 5:
-            base_score = 0.6
-        elif aspect_ratio > 3:
-            base_score = 0.8
-        else:
-            base_score = 1.0
-
-        if frame_type == 'moment frame':
-            frame_factor = 0.9
-        elif frame_type == 'braced frame':
-            frame_factor = 1.0
-        else:  # shear wall
-            frame_factor = 1.1
-
-        if material == 'steel':
-            material_factor = 1.1
-        elif material == 'concrete':
-            material_factor = 1.0
-        else:  # wood
-            material_factor = 0.8
-
-        return base_score * frame_factor * material_factor
-
+        traits = self.genome.traits()
+        scores = _analyse_core(traits.height, traits.width, traits.length, traits.material, traits.frame_type)
+        return dict(zip(STRUCTURAL_SCORES, scores))
+
+    @staticmethod
+    def analyse_batch(records):
+        # Overall integrity of every genome in a GENOME_DTYPE record array, same model as analyse()
+        envelope, structure = records['building_envelope'], records['structural_system']
+        return _integrity_kernel(envelope['height'], envelope['width'], envelope['length'],
+                                 category_codes(structure['material'], _MATERIAL),
+                                 category_codes(structure['frame_type'], _FRAME))
+
+# Keys of the analyse() result, in the order _analyse_core returns them
+STRUCTURAL_SCORES = ("overall_integrity", "lateral_stability", "vertical_load_capacity",
+                     "foundation_stability", "seismic_performance", "wind_resistance")
+
+@functools.lru_cache(maxsize=4096)
+def _analyse_core(height, width, length, material, frame_type):
+    # Genomes sharing envelope and structural genes (elites, crossover children) reuse the cached scores
+    footprint = width * length
+    material = material if material in DENSITY else 'wood'
+    frame_type = frame_type if frame_type in FRAME_FACTOR else 'shear wall'
+
+    # Shared by the lateral, seismic and wind scores
+    aspect_ratio = height / min(width, length)
+    material_factor = MATERIAL_FACTOR[material]
+    frame_and_material = FRAME_FACTOR[frame_type] * material_factor
+
+    tier = bisect_left(ASPECT_RATIO_TIERS, aspect_ratio)
+    lateral_stability = LATERAL_BASE_SCORE[tier] * frame_and_material
+    wind_resistance = WIND_BASE_SCORE[tier] * frame_and_material
+
+    # Safety factors against ideals of 3 for load capacity and 2 for the foundation
+    mass = height * footprint * DENSITY[material]
+    vertical_load_capacity = min(1, STRENGTH[material] * footprint / (mass * 9.81) / 3)
+    estimated_building_weight = footprint * 5000  # Rough estimate: 5000 N/m^2
+    foundation_stability = min(1, footprint * BASE_PRESSURE[material] / estimated_building_weight / 2)
+
+    seismic_performance = SEISMIC_FRAME_SCORE[frame_type] * material_factor * max(0, 1 - (height - 20) * 0.005)
+
+    # Calculate overall structural integrity
+    overall_integrity = (
+        lateral_stability * 0.25 +
+        vertical_load_capacity * 0.25 +
+        foundation_stability * 0.2 +
+        seismic_performance * 0.15 +
+        wind_resistance * 0.15
+    )
+
+    return (overall_integrity, lateral_stability, vertical_load_capacity,
+            foundation_stability, seismic_performance, wind_resistance)
+
+_MATERIAL = ('structural_system', 'material')
+_FRAME = ('structural_system', 'frame_type')
+
+def _by_code(table, name, fallback):
+    # table as an array indexed by category code, the last slot holding the fallback for unknown labels
+    return np.array([table[label] for label in CATEGORIES[name]] + [table[fallback]])
+
+_MATERIAL_FACTOR_BY_CODE = _by_code(MATERIAL_FACTOR, _MATERIAL, 'wood')
+_FRAME_FACTOR_BY_CODE = _by_code(FRAME_FACTOR, _FRAME, 'shear wall')
+_SEISMIC_BY_CODE = _by_code(SEISMIC_FRAME_SCORE, _FRAME, 'shear wall') * _MATERIAL_FACTOR_BY_CODE[:, None]
+# Load capacity over weight: the footprint cancels, leaving strength / (height * density * g)
+_LOAD_CAPACITY_BY_CODE = _by_code(STRENGTH, _MATERIAL, 'wood') / (_by_code(DENSITY, _MATERIAL, 'wood') * 9.81 * 3)
+_FOUNDATION_BY_CODE = np.minimum(1, _by_code(BASE_PRESSURE, _MATERIAL, 'wood') / 5000 / 2)
+_LATERAL_BY_TIER = np.array(LATERAL_BASE_SCORE)
+_WIND_BY_TIER = np.array(WIND_BASE_SCORE)
+
+def _integrity_kernel(height, width, length, material_code, frame_code):
+    aspect_ratio = height / np.minimum(width, length)
+    tier = np.searchsorted(ASPECT_RATIO_TIERS, aspect_ratio)
+    frame_and_material = _FRAME_FACTOR_BY_CODE[frame_code] * _MATERIAL_FACTOR_BY_CODE[material_code]
+
+    lateral_stability = _LATERAL_BY_TIER[tier] * frame_and_material
+    vertical_load_capacity = np.minimum(1, _LOAD_CAPACITY_BY_CODE[material_code] / height)
+    foundation_stability = _FOUNDATION_BY_CODE[material_code]
+    seismic_performance = _SEISMIC_BY_CODE[material_code, frame_code] * np.maximum(0, 1 - (height - 20) * 0.005)
+    wind_resistance = _WIND_BY_TIER[tier] * frame_and_material
+
+    return (lateral_stability * 0.25 + vertical_load_capacity * 0.25 + foundation_stability * 0.2
+            + seismic_performance * 0.15 + wind_resistance * 0.15)
 
 # Example use case
 if __name__ == "__main__":
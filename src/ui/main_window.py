@@ -15,22 +15,23 @@
 
 import sys
 import json
+import logging
 import numpy as np
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QSpinBox, QDoubleSpinBox, QFileDialog, QSlider, QTabWidget, QTextEdit, QMessageBox, QInputDialog
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThread, QThreadPool, pyqtSignal
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
 from ..genetic_algorithm.evolution import EvolutionaryAlgorithm
 from ..visualisation.building_visualiser import BuildingVisualiser
 from ..visualisation.pareto_front_visualiser import ParetoFrontVisualiser
-from ..bim_integration.ifc_interface import IFCInterface
-from ..analysis.design_report import DesignReport
 from ..db.database import Database
 from ..fitness_evaluation.fitness_function import FitnessFunction
 from ..encoder_decoder.encoder import Encoder
 from ..encoder_decoder.decoder import Decoder
 
+logger = logging.getLogger(__name__)
+
 class EvolutionThread(QThread):
     update_progress = pyqtSignal(int, object, object)
     evolution_complete = pyqtSignal(object, object)
@@ -40,19 +41,40 @@ class EvolutionThread(QThread):
         self.ea = ea
 
     def run(self):
+        # evolve() returns the final population's scores as computed in its last generation
         best_genome, fitness_scores = self.ea.evolve(self.progress_callback)
-        # fitness_scores = self.ea.evaluate_fitness()
         self.evolution_complete.emit(best_genome, fitness_scores)
 
     def progress_callback(self, generation, best_fitness, avg_fitness):
         self.update_progress.emit(generation, best_fitness, avg_fitness)
 
+class ReportSignals(QObject):
+    report_ready = pyqtSignal(object, object)
+
+class ReportRunnable(QRunnable):
+    # Runs the DesignReport simulations on the global thread pool; report_ready carries the genome
+    # and its DesignReport (with the report already cached) back to the GUI thread for drawing
+    def __init__(self, genome):
+        QRunnable.__init__(self)
+        self.genome = genome
+        self.signals = ReportSignals()
+
+    def run(self):
+        from ..analysis.design_report import DesignReport
+        report_generator = DesignReport(self.genome)
+        report_generator.generate_report()
+        self.signals.report_ready.emit(self.genome, report_generator)
+
 class MainWindow(QMainWindow):
+    # Optimisation history rows are written to the database in batches of this size
+    HISTORY_FLUSH_INTERVAL = 25
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Evolving Resilience - AI-Driven Architectural Solutions for High-Risk Areas")
         self.setGeometry(100, 100, 1200, 800)
         self.db = Database("buildings.db")
+        self._pending_history = []
         self.encoder = Encoder()
         self.decoder = Decoder()
 
@@ -129,16 +151,22 @@ class MainWindow(QMainWindow):
         # 3D Visualisation Tab
         self.figure_3d = Figure(figsize=(8, 6), dpi=100)
         self.canvas_3d = FigureCanvas(self.figure_3d)
+        self.ax_3d = self.figure_3d.add_subplot(111, projection='3d')
         results_panel.addTab(self.canvas_3d, "3D Visualisation")
 
         # Pareto Front Tab
         self.figure_pareto = Figure(figsize=(8, 6), dpi=100)
         self.canvas_pareto = FigureCanvas(self.figure_pareto)
+        self.ax_pareto = self.figure_pareto.add_subplot(221)
+        self.ax_pareto_3d = self.figure_pareto.add_subplot(222, projection='3d')
+        self.ax_parallel = self.figure_pareto.add_subplot(223)
+        self.ax_pareto_radar = self.figure_pareto.add_subplot(224, projection='polar')
         results_panel.addTab(self.canvas_pareto, "Pareto Front")
 
         # Performance Radar Tab
         self.figure_radar = Figure(figsize=(8, 6), dpi=100)
         self.canvas_radar = FigureCanvas(self.figure_radar)
+        self.ax_performance_radar = self.figure_radar.add_subplot(111, projection='polar')
         results_panel.addTab(self.canvas_radar, "Performance Radar")
 
         # Detailed Results Tab
@@ -151,15 +179,24 @@ class MainWindow(QMainWindow):
         self.ea = None
         self.evolution_thread = None
         self.best_genome = None
+        self.report_generator = None
         self.fitness_scores = None
-        self.ifc_interface = IFCInterface()
+        self._ifc_interface = None
+
+    @property
+    def ifc_interface(self):
+        # ifcopenshell is only loaded once the user imports or exports an IFC file
+        if self._ifc_interface is None:
+            from ..bim_integration.ifc_interface import IFCInterface
+            self._ifc_interface = IFCInterface()
+        return self._ifc_interface
 
     def start_evolution(self):
         population_size = self.population_size_spin.value()
         generations = self.generations_spin.value()
         mutation_rate = self.mutation_rate_spin.value()
         
-        print(f"Generations: {generations}, Population Size: {population_size}, Mutation Rate: {mutation_rate}")
+        logger.info("Generations: %d, Population Size: %d, Mutation Rate: %s", generations, population_size, mutation_rate)
         self.ea = EvolutionaryAlgorithm(population_size=population_size, 
                                         mutation_rate=mutation_rate,
                                         generations=generations)
@@ -176,8 +213,10 @@ class MainWindow(QMainWindow):
         self.progress_label.setText("Evolution in progress...")
 
     def update_progress(self, generation, best_fitness, avg_fitness):
-        # Save optimisation history in the main thread
-        self.db.save_optimisation_history(generation, best_fitness, avg_fitness)
+        # Buffer optimisation history in the main thread, written every HISTORY_FLUSH_INTERVAL generations
+        self._pending_history.append((generation, best_fitness, avg_fitness))
+        if len(self._pending_history) >= self.HISTORY_FLUSH_INTERVAL:
+            self.flush_history()
         best_fitness_str = ", ".join([f"{x:.2f}" for x in best_fitness])
         avg_fitness_str = ", ".join([f"{x:.2f}" for x in avg_fitness])
         self.progress_label.setText(f"Generation: {generation + 1}\nBest Fitness: [{best_fitness_str}]\nAvg Fitness: [{avg_fitness_str}]")
@@ -192,27 +231,30 @@ class MainWindow(QMainWindow):
         self.fitness_scores = fitness_scores
         # Find the index of the best genome based on mean fitness
         best_index = np.argmax(np.mean(fitness_scores, axis=1))
-        # Save the best genome with its fitness scores
-        self.db.save_building(best_genome, fitness_scores[best_index])
+        # Save the remaining history and the best genome with its fitness scores in one commit
+        with self.db.transaction():
+            self.flush_history()
+            self.db.save_building(best_genome, fitness_scores[best_index])
         self.update_visualisations()
 
+    def flush_history(self):
+        if self._pending_history:
+            self.db.save_optimisation_history_batch(self._pending_history)
+            self._pending_history = []
+
     def update_visualisations(self, from_db=False):
-        # Update 3D Visualisation
-        self.figure_3d.clear()
-        ax_3d = self.figure_3d.add_subplot(111, projection='3d')
+        # Update 3D Visualisation; every axes is created once in __init__ and cleared for each redraw
+        self._reset_axes(self.ax_3d)
         visualiser = BuildingVisualiser(self.best_genome)
-        visualiser.visualise(ax_3d)
-        self.canvas_3d.draw()
+        visualiser.visualise(self.ax_3d)
+        self.canvas_3d.draw_idle()
 
         # Update Pareto Front
-        self.figure_pareto.clear()
-        ax_pareto = self.figure_pareto.add_subplot(221)
-        ax_pareto_3d = self.figure_pareto.add_subplot(222, projection='3d')
-        ax_parallel = self.figure_pareto.add_subplot(223)
-        ax_radar = self.figure_pareto.add_subplot(224, projection='polar')
-        
+        ax_pareto, ax_pareto_3d, ax_parallel, ax_radar = self.ax_pareto, self.ax_pareto_3d, self.ax_parallel, self.ax_pareto_radar
+        self._reset_axes(ax_pareto, ax_pareto_3d, ax_parallel, ax_radar)
+
         if not from_db and self.ea and hasattr(self.ea, 'population') and hasattr(self.ea, 'all_fitness_scores'):
-            pareto_visualiser = ParetoFrontVisualiser(self.ea.population, np.array(self.ea.all_fitness_scores))
+            pareto_visualiser = ParetoFrontVisualiser(self.ea.population, self.ea.all_fitness_scores)
             pareto_visualiser.visualise_2d(ax_pareto)
             pareto_visualiser.visualise_3d(ax_pareto_3d)
             pareto_visualiser.visualise_parallel_coordinates(ax_parallel)
@@ -229,19 +271,36 @@ class MainWindow(QMainWindow):
             ax_radar.axis('off')
             
         self.figure_pareto.tight_layout()
-        self.canvas_pareto.draw()
+        self.canvas_pareto.draw_idle()
+
+        # The design report runs every simulation, so it is built off the GUI thread; show_report
+        # draws the performance radar and detailed results once it is ready
+        self.report_generator = None
+        self.detailed_results.setText("Generating report...")
+        runnable = ReportRunnable(self.best_genome)
+        runnable.signals.report_ready.connect(self.show_report)
+        QThreadPool.globalInstance().start(runnable)
+
+    def show_report(self, genome, report_generator):
+        if genome is not self.best_genome:
+            return  # A newer design was loaded while this report was being generated
+        self.report_generator = report_generator
 
         # Update Performance Radar
-        self.figure_radar.clear()
-        ax_radar = self.figure_radar.add_subplot(111, projection='polar')
-        report_generator = DesignReport(self.best_genome)
-        report = report_generator.generate_report()
-        report_generator.plot_performance_radar(ax_radar)
-        self.canvas_radar.draw()
+        self._reset_axes(self.ax_performance_radar)
+        report_generator.plot_performance_radar(self.ax_performance_radar)
+        self.canvas_radar.draw_idle()
 
         # Update Detailed Results
-        self.detailed_results.setText(str(report))
+        self.detailed_results.setText(str(report_generator.generate_report()))
             
+    @staticmethod
+    def _reset_axes(*axes):
+        # cla() leaves 3D axes switched off after a "No evolution data" message, so switch them back on
+        for ax in axes:
+            ax.cla()
+            ax.set_axis_on()
+
     def import_ifc(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Import IFC File", "", "IFC Files (*.ifc)")
         if file_path:
@@ -271,7 +330,11 @@ class MainWindow(QMainWindow):
             file_path, _ = QFileDialog.getSaveFileName(self, "Save Report", "", "Excel Files (*.xlsx)")
             if file_path:
                 try:
-                    report_generator = DesignReport(self.best_genome)
+                    # Reuse the report shown in the window when it belongs to this genome
+                    report_generator = self.report_generator
+                    if report_generator is None or report_generator.genome is not self.best_genome:
+                        from ..analysis.design_report import DesignReport
+                        report_generator = DesignReport(self.best_genome)
                     report_generator.save_report(file_path)
                     QMessageBox.information(self, "Report Generated", "Report Generated Successfully")
                 except Exception as e:
@@ -322,9 +385,11 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "No Data", "No genome available for export")
 
     def __del__(self):
+        self.flush_history()
         self.db.close()
 
     def closeEvent(self, event):
+        self.flush_history()
         self.db.close()
         super().closeEvent(event)
 
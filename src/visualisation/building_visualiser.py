@@ -2,8 +2,12 @@
 
 ## The BuildingVisualiser class visualises the building design based on the genome of the building.
 
+import logging
+
 import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+from mpl_toolkits.mplot3d.art3d import Line3DCollection, Poly3DCollection
+
+logger = logging.getLogger(__name__)
 
 class BuildingVisualiser:
     def __init__(self, genome):
@@ -96,7 +100,7 @@ class BuildingVisualiser:
         ]
     
     def _get_vertices(self, width, length, height, shape):
-        print(f"Shape: {shape}")
+        logger.debug("Shape: %s", shape)
         if shape == 'rectangular':
             return self._get_rectangular_vertices(width, length, height)
         elif shape == 'L-shaped':
@@ -113,84 +117,90 @@ class BuildingVisualiser:
             self._add_shear_wall(ax, width, length, height, num_floors)
 
     def _add_moment_frame(self, ax, width, length, height, num_floors):
+        ax.add_collection3d(Line3DCollection(self._moment_frame_segments(width, length, height, num_floors),
+                                             colors='red', linewidths=2))
+
+    def _moment_frame_segments(self, width, length, height, num_floors):
+        segments = []
         for i in range(num_floors + 1):
             z = i * height / num_floors
-            ax.plot([0, width], [0, 0], [z, z], color='red', linewidth=2)
-            ax.plot([0, width], [length, length], [z, z], color='red', linewidth=2)
-            ax.plot([0, 0], [0, length], [z, z], color='red', linewidth=2)
-            ax.plot([width, width], [0, length], [z, z], color='red', linewidth=2)
+            segments += [
+                [[0, 0, z], [width, 0, z]],
+                [[0, length, z], [width, length, z]],
+                [[0, 0, z], [0, length, z]],
+                [[width, 0, z], [width, length, z]]
+            ]
 
         for x in [0, width]:
             for y in [0, length]:
-                ax.plot([x, x], [y, y], [0, height], color='red', linewidth=2)
+                segments.append([[x, y, 0], [x, y, height]])
+        return segments
 
     def _add_braced_frame(self, ax, width, length, height, num_floors):
         self._add_moment_frame(ax, width, length, height, num_floors)
+        braces = []
         for i in range(num_floors):
             z1 = i * height / num_floors
             z2 = (i + 1) * height / num_floors
-            ax.plot([0, width], [0, 0], [z1, z2], color='blue', linewidth=2)
-            ax.plot([width, 0], [0, 0], [z1, z2], color='blue', linewidth=2)
-            ax.plot([0, width], [length, length], [z1, z2], color='blue', linewidth=2)
-            ax.plot([width, 0], [length, length], [z1, z2], color='blue', linewidth=2)
+            braces += [
+                [[0, 0, z1], [width, 0, z2]],
+                [[width, 0, z1], [0, 0, z2]],
+                [[0, length, z1], [width, length, z2]],
+                [[width, length, z1], [0, length, z2]]
+            ]
+        ax.add_collection3d(Line3DCollection(braces, colors='blue', linewidths=2))
 
     def _add_shear_wall(self, ax, width, length, height, num_floors):
         wall_thickness = 0.3  # Assume 30cm thick walls
         wall_color = '#90EE90'  # Light green colour for shear walls
-        
-        # Left wall
-        self._add_wall(ax, [0, 0, 0], [wall_thickness, length, height], wall_color)
-        
-        # Front wall
-        self._add_wall(ax, [0, 0, 0], [width, wall_thickness, height], wall_color)
-        
-        # Right wall
-        self._add_wall(ax, [width - wall_thickness, 0, 0], [width, length, height], wall_color)
-        
-        # Back wall
-        self._add_wall(ax, [0, length - wall_thickness, 0], [width, length, height], wall_color)
 
+        walls = [
+            self._wall_face([0, 0, 0], [wall_thickness, length, height]),  # Left wall
+            self._wall_face([0, 0, 0], [width, wall_thickness, height]),  # Front wall
+            self._wall_face([width - wall_thickness, 0, 0], [width, length, height]),  # Right wall
+            self._wall_face([0, length - wall_thickness, 0], [width, length, height])  # Back wall
+        ]
+        ax.add_collection3d(Poly3DCollection(walls, facecolors=wall_color, edgecolors='black', alpha=0.7))
 
-    def _add_wall(self, ax, start, end, colour):
+    def _wall_face(self, start, end):
         x = [start[0], end[0], end[0], start[0], start[0]]
         y = [start[1], start[1], end[1], end[1], start[1]]
         z = [start[2], start[2], end[2], end[2], start[2]]
-        verts = [list(zip(x, y, z))]
-        ax.add_collection3d(Poly3DCollection(verts, facecolors=colour, edgecolors='black', alpha=0.7))
+        return list(zip(x, y, z))
 
     def _add_windows(self, ax, vertices, window_ratio, num_floors):
         # Extract the total height of the building
         total_height = max(vertex[2] for face in vertices for vertex in face)
         floor_height = total_height / num_floors
+        window_height = floor_height * 0.6  # Window takes 60% of floor height
 
-        # Add windows to each face
+        # Every window goes into one collection, so the canvas draws a single artist for them
+        windows = []
         for face in vertices[2:]:  # Skip bottom and top faces
+            x_coords = [v[0] for v in face]
+            y_coords = [v[1] for v in face]
+
+            min_x, max_x = min(x_coords), max(x_coords)
+            min_y, max_y = min(y_coords), max(y_coords)
+
             for i in range(num_floors):
                 z = i * floor_height
-                window_height = floor_height * 0.6  # Window takes 60% of floor height
                 window_start = z + (floor_height - window_height) / 2
 
-                x_coords = [v[0] for v in face]
-                y_coords = [v[1] for v in face]
-
-                min_x, max_x = min(x_coords), max(x_coords)
-                min_y, max_y = min(y_coords), max(y_coords)
-
                 if max_x - min_x > 0.1:  # Vertical face
                     window_width = (max_x - min_x) * window_ratio
                     x_start = min_x + (max_x - min_x - window_width) / 2
-                    ax.add_collection3d(Poly3DCollection([
-                        [[x_start, min_y, window_start], [x_start + window_width, min_y, window_start],
-                        [x_start + window_width, min_y, window_start + window_height], [x_start, min_y, window_start + window_height]]
-                    ], facecolors='skyblue', linewidths=1, edgecolors='blue'))
+                    windows.append([[x_start, min_y, window_start], [x_start + window_width, min_y, window_start],
+                                    [x_start + window_width, min_y, window_start + window_height], [x_start, min_y, window_start + window_height]])
 
                 if max_y - min_y > 0.1:  # Horizontal face
                     window_width = (max_y - min_y) * window_ratio
                     y_start = min_y + (max_y - min_y - window_width) / 2
-                    ax.add_collection3d(Poly3DCollection([
-                        [[min_x, y_start, window_start], [min_x, y_start + window_width, window_start],
-                        [min_x, y_start + window_width, window_start + window_height], [min_x, y_start, window_start + window_height]]
-                    ], facecolors='skyblue', linewidths=1, edgecolors='blue'))
+                    windows.append([[min_x, y_start, window_start], [min_x, y_start + window_width, window_start],
+                                    [min_x, y_start + window_width, window_start + window_height], [min_x, y_start, window_start + window_height]])
+
+        if windows:
+            ax.add_collection3d(Poly3DCollection(windows, facecolors='skyblue', linewidths=1, edgecolors='blue'))
 
 # Example use case
 if __name__ == "__main__":
@@ -4,6 +4,7 @@
 ## It provides visualisation methods for 2D, 3D, parallel coordinates, and radar chart plots.
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.collections import LineCollection
 
 class ParetoFrontVisualiser:
     def __init__(self, population, fitness_scores):
@@ -43,9 +44,11 @@ class ParetoFrontVisualiser:
             # Normalize the data
             normalized_scores = (self.fitness_scores - self.fitness_scores.min(axis=0)) / (self.fitness_scores.max(axis=0) - self.fitness_scores.min(axis=0))
             
-            for i in range(len(normalized_scores)):
-                ax.plot(range(normalized_scores.shape[1]), normalized_scores[i], color='blue', alpha=0.1)
-            
+            # One polyline per individual, drawn as a single collection
+            axis_positions = np.broadcast_to(np.arange(normalized_scores.shape[1]), normalized_scores.shape)
+            ax.add_collection(LineCollection(np.stack([axis_positions, normalized_scores], axis=-1), colors='blue', alpha=0.1))
+            ax.autoscale_view()
+
             ax.set_xticks(range(normalized_scores.shape[1]))
             ax.set_xticklabels(['Obj ' + str(i+1) for i in range(normalized_scores.shape[1])])
             ax.set_ylabel('Normalized Score')
@@ -1,7 +1,9 @@
 import unittest
 import os
+import numpy as np
 from src.analysis.design_report import DesignReport
 from src.genetic_algorithm.encoding import BuildingGenome
+from src.simulation_engine.structural_integrity import StructuralIntegrity
 
 class TestAnalysis(unittest.TestCase):
     def setUp(self):
@@ -13,11 +15,32 @@ class TestAnalysis(unittest.TestCase):
         self.assertIsInstance(report, dict)
         self.assertIn('Building Characteristics', report)
 
+    def test_generate_report_is_cached(self):
+        report = self.report_generator.generate_report()
+        self.assertIs(self.report_generator.generate_report(), report)
+        self.report_generator.invalidate()
+        self.assertIsNot(self.report_generator.generate_report(), report)
+
+    def test_invalidate_reads_mutated_genome(self):
+        self.report_generator.generate_report()
+        self.genome.mutate(1.0)
+        self.report_generator.invalidate()
+        report = self.report_generator.generate_report()
+        self.assertEqual(self.report_generator.safety_assessment.traits, self.genome.traits())
+        self.assertEqual(report['Structural Integrity'], StructuralIntegrity(self.genome).analyse())
+
     def test_generate_summary_table(self):
         report = self.report_generator.generate_report()
         summary_table = self.report_generator.generate_summary_table(report)
         self.assertEqual(len(summary_table), 1)
 
+    def test_generate_detailed_table(self):
+        report = {'Blast Resistance': {'max_displacement': np.float64(0.5), 'damage_index': 0}}
+        detailed_table = self.report_generator.generate_detailed_table(report)
+        self.assertEqual(list(detailed_table.columns), ['Section', 'Metric', 'Value'])
+        self.assertEqual(detailed_table.iloc[0].tolist(), ['Blast Resistance', 'max_displacement', 0.5])
+        self.assertIs(type(next(self.report_generator.detailed_rows(report))[2]), float)
+
     def test_save_report(self):
         output_path = "test_report.xlsx"
         self.report_generator.save_report(output_path)
@@ -1,5 +1,8 @@
 import unittest
 import os
+import numpy as np
+import ifcopenshell
+import ifcopenshell.api
 from src.bim_integration.ifc_interface import IFCInterface
 from src.genetic_algorithm.encoding import BuildingGenome
 
@@ -14,6 +17,36 @@ class TestBIMIntegration(unittest.TestCase):
         self.assertTrue(os.path.exists(output_path))
         os.remove(output_path)
 
+    def test_bounding_box_of_building_covers_contained_elements(self):
+        ifc_file = ifcopenshell.file(schema="IFC4")
+        project = ifcopenshell.api.run("root.create_entity", ifc_file, ifc_class="IfcProject")
+        ifcopenshell.api.run("unit.assign_unit", ifc_file)
+        model = ifcopenshell.api.run("context.add_context", ifc_file, context_type="Model")
+        body = ifcopenshell.api.run("context.add_context", ifc_file, context_type="Model", context_identifier="Body",
+                                    target_view="MODEL_VIEW", parent=model)
+        building = ifcopenshell.api.run("root.create_entity", ifc_file, ifc_class="IfcBuilding")
+        storey = ifcopenshell.api.run("root.create_entity", ifc_file, ifc_class="IfcBuildingStorey")
+        ifcopenshell.api.run("aggregate.assign_object", ifc_file, relating_object=project, products=[building])
+        ifcopenshell.api.run("aggregate.assign_object", ifc_file, relating_object=building, products=[storey])
+        walls = []
+        for x in (0, 100):
+            wall = ifcopenshell.api.run("root.create_entity", ifc_file, ifc_class="IfcWall")
+            placement = np.eye(4)
+            placement[0, 3] = x
+            ifcopenshell.api.run("geometry.edit_object_placement", ifc_file, product=wall, matrix=placement)
+            representation = ifcopenshell.api.run("geometry.add_wall_representation", ifc_file, context=body,
+                                                  length=5, height=3, thickness=0.2)
+            ifcopenshell.api.run("geometry.assign_representation", ifc_file, product=wall, representation=representation)
+            walls.append(wall)
+        # Only the first wall is in the building; the second is tessellated but not contained
+        ifcopenshell.api.run("spatial.assign_container", ifc_file, relating_structure=storey, products=walls[:1])
+
+        self.ifc_interface._index_products(ifc_file)
+        self.ifc_interface._iter_shapes(ifc_file, ifc_file.by_type("IfcProduct"))
+        bbox_min, bbox_max = self.ifc_interface.calculate_bounding_box(building)
+        np.testing.assert_allclose(bbox_min, [0, 0, 0], atol=1e-9)
+        np.testing.assert_allclose(bbox_max, [5, 0.2, 3], atol=1e-9)
+
     # # def test_import_from_ifc(self):
     # #     sample_ifc_path = "test_import.ifc"
     # #     self.ifc_interface.export_to_ifc(self.genome, sample_ifc_path)
@@ -1,5 +1,7 @@
 import unittest
 import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
 from src.db.database import Database
 from src.genetic_algorithm.encoding import BuildingGenome
 
@@ -21,11 +23,49 @@ class TestDatabase(unittest.TestCase):
         self.assertIsNotNone(retrieved_building)
         self.assertIsInstance(retrieved_building['genome'], BuildingGenome)
 
+    def test_get_buildings(self):
+        ids = [self.db.save_building(BuildingGenome(), [i / 10] * 7) for i in range(3)]
+        buildings = self.db.get_buildings(ids[::-1] + [ids[0], 999])
+        self.assertEqual(sorted(buildings), ids)
+        self.assertAlmostEqual(buildings[ids[2]]['overall_fitness'], 0.2)
+        self.assertIsInstance(buildings[ids[1]]['genome'], BuildingGenome)
+
+    def test_save_buildings(self):
+        saved = self.db.save_buildings([(self.genome, self.fitness_scores), (BuildingGenome(), [0.1] * 7)])
+        self.assertEqual(saved, 2)
+        top = self.db.get_top_buildings()
+        self.assertEqual(len(top), 2)
+        self.assertAlmostEqual(top[0]['overall_fitness'], sum(self.fitness_scores) / 7)
+
     def test_save_and_get_optimisation_history(self):
         self.db.save_optimisation_history(1, [0.9, 0.8, 0.7], [0.7, 0.6, 0.5])
         history = self.db.get_optimisation_history()
         self.assertEqual(len(history), 1)
         self.assertEqual(history[0]['generation'], 1)
 
+    def test_reads_legacy_pickled_history(self):
+        self.db.cursor.execute('INSERT INTO optimisation_history (generation, best_fitness, average_fitness) VALUES (?, ?, ?)',
+                               (1, pickle.dumps([0.9]), pickle.dumps([0.7])))
+        self.db.save_optimisation_history(2, [0.95], [0.75])
+        history = self.db.get_optimisation_history()
+        self.assertEqual([entry['best_fitness'] for entry in history], [[0.9], [0.95]])
+
+    def test_concurrent_writes(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda generation: self.db.save_optimisation_history(generation, [0.9], [0.7]), range(20)))
+        self.assertEqual(len(self.db.get_optimisation_history()), 20)
+
+    def test_interrupted_transaction_does_not_block_commits(self):
+        with self.assertRaises(KeyboardInterrupt):
+            with self.db.transaction():
+                self.db.save_optimisation_history(1, [0.9], [0.7])
+                raise KeyboardInterrupt
+        self.db.save_optimisation_history(2, [0.95], [0.75])
+        other = Database(self.db_file)
+        try:
+            self.assertEqual([entry['generation'] for entry in other.get_optimisation_history()], [2])
+        finally:
+            other.close()
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
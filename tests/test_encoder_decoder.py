@@ -3,7 +3,7 @@
 import unittest
 from src.encoder_decoder.encoder import Encoder
 from src.encoder_decoder.decoder import Decoder
-from src.genetic_algorithm.encoding import BuildingGenome
+from src.genetic_algorithm.encoding import BuildingGenome, BuildingGenomeFlat, population_as_soa
 
 class TestEncoderDecoder(unittest.TestCase):
     def setUp(self):
@@ -53,5 +53,22 @@ class TestEncoderDecoder(unittest.TestCase):
         decoded_design = self.decoder.decode(genome)
         self.assertEqual(self.architectural_design, decoded_design)
 
+    def test_encode_flat(self):
+        flat = self.encoder.encode_flat(self.architectural_design)
+        self.assertEqual(flat.facade_material, 'glass')
+        self.assertEqual(hash(flat), hash(self.encoder.encode_flat(self.architectural_design)))
+        self.assertEqual(self.decoder.decode(flat.to_tree()), self.architectural_design)
+        self.assertEqual(BuildingGenomeFlat.from_genome(flat.to_tree()), flat)
+
+    def test_decode_matches_section_decoders(self):
+        genome = BuildingGenome()
+        expected = {key: decode_func(genome.genes[key]) for key, decode_func in self.decoder.decoding_schemes.items()}
+        self.assertEqual(self.decoder.decode(genome), expected)
+
+    def test_decode_records(self):
+        genome = self.encoder.encode(self.architectural_design)
+        self.assertEqual(self.decoder.decode(genome.as_soa()), self.architectural_design)
+        self.assertEqual(self.decoder.decode(population_as_soa([genome, genome])), [self.architectural_design] * 2)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 from src.fitness_evaluation.fitness_function import FitnessFunction
 from src.genetic_algorithm.encoding import BuildingGenome
 
@@ -19,5 +20,17 @@ class TestFitnessEvaluation(unittest.TestCase):
         self.assertEqual(self.fitness_function.weights['safety'], 0.5)
         self.assertEqual(self.fitness_function.weights['cost'], 0.5)
 
+    def test_total_uses_updated_weights(self):
+        self.fitness_function.update_weights({key: 0.2 for key in self.fitness_function.weights})
+        _, weighted_scores, total_score = self.fitness_function.evaluate(self.genome, lambda x: [0.5] * 7)
+        self.assertAlmostEqual(total_score, 0.5)
+        self.assertAlmostEqual(weighted_scores['cost'], 0.1)
+
+    def test_evaluate_batch(self):
+        scores = np.random.random((6, 7))
+        totals = self.fitness_function.evaluate_batch(scores)
+        expected = [self.fitness_function.evaluate(self.genome, lambda x: row)[2] for row in scores]
+        np.testing.assert_allclose(totals, expected)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,9 +1,11 @@
 # "tests/test_genetic_algorithm.py"
 
+import pickle
 import unittest
-from src.genetic_algorithm.encoding import BuildingGenome, HierarchicalGene
-from src.genetic_algorithm.evolution import EvolutionaryAlgorithm
-from src.genetic_algorithm.nsga_ii import NSGAII
+import numpy as np
+from src.genetic_algorithm.encoding import BuildingGenome, HierarchicalGene, GenomePopulation, population_as_soa, category_codes, category_lookup
+from src.genetic_algorithm.evolution import OBJECTIVES, EvolutionaryAlgorithm
+from src.genetic_algorithm.nsga_ii import NSGA_OBJECTIVES, NSGAII
 
 class TestBuildingGenome(unittest.TestCase):
     def setUp(self):
@@ -30,6 +32,93 @@ class TestBuildingGenome(unittest.TestCase):
         self.assertNotEqual(child.genes, parent1.genes)
         self.assertNotEqual(child.genes, parent2.genes)
 
+    def test_mutate_does_not_touch_parents(self):
+        parent1 = BuildingGenome()
+        parent2 = BuildingGenome()
+        before = (parent1.as_soa(), parent2.as_soa())
+        child = parent1.crossover(parent2)
+        child.mutate(mutation_rate=1.0)
+        self.assertEqual((parent1.as_soa(), parent2.as_soa()), before)
+        self.assertNotEqual(child.as_soa(), parent1.as_soa())
+
+    def test_gene_mutate_does_not_touch_parents(self):
+        parent1 = BuildingGenome()
+        parent2 = BuildingGenome()
+        before = (parent1.as_soa(), parent2.as_soa())
+        child = parent1.crossover(parent2)
+        child.genes['building_envelope'].mutate(1.0)
+        self.assertEqual((parent1.as_soa(), parent2.as_soa()), before)
+        self.assertNotEqual(child.as_soa(), before[0])
+        self.assertNotEqual(child.as_soa(), before[1])
+
+    def test_genes_access(self):
+        genes = self.genome.genes
+        self.assertIs(genes['facade'], genes.facade)
+        self.assertEqual(list(genes.keys()), ['building_envelope', 'structural_system', 'floor_plans', 'mep_systems', 'facade'])
+        self.assertEqual([gene.name for gene in genes.values()], list(genes.keys()))
+
+    def test_traits(self):
+        traits = self.genome.traits()
+        self.assertEqual(traits.width, self.genome.genes['building_envelope'].children[1].value)
+        self.assertEqual(traits.facade_material, self.genome.genes['facade'].children[1].value)
+        self.assertEqual(tuple(traits), sum(self.genome._record(), ()))
+
+    def test_category_codes(self):
+        labels = np.array(['steel', 'wood', 'brick', 'concrete'])
+        name = ('structural_system', 'material')
+        self.assertEqual(category_codes(labels, name).tolist(), [1, 2, 3, 0])
+        np.testing.assert_allclose(category_lookup(labels, name, {'concrete': 0.8, 'steel': 0.9, 'wood': 0.6}, 0.5), [0.9, 0.6, 0.5, 0.8])
+
+    def test_unpickle_dict_genes(self):
+        # Genomes pickled while genes was a dict still load
+        legacy = BuildingGenome.__new__(BuildingGenome)
+        legacy.__setstate__({'genes': dict(self.genome.genes.items())})
+        self.assertIs(legacy.genes.facade, self.genome.genes.facade)
+        restored = pickle.loads(pickle.dumps(self.genome))
+        self.assertEqual(restored.as_soa(), self.genome.as_soa())
+
+    def test_str(self):
+        lines = str(self.genome).split('\n')
+        self.assertEqual(len(lines), 19)
+        self.assertEqual(lines[0], 'building_envelope: None')
+        self.assertTrue(lines[1].startswith('  height: '))
+
+    def test_population_as_soa(self):
+        population = [self.genome, BuildingGenome()]
+        records = population_as_soa(population)
+        self.assertEqual(records.shape, (2,))
+        self.assertEqual(records['building_envelope']['height'][0], self.genome.genes['building_envelope'].children[0].value)
+        self.assertEqual(records[1], population[1].as_soa())
+
+class TestGenomePopulation(unittest.TestCase):
+    def setUp(self):
+        self.genomes = [BuildingGenome() for _ in range(8)]
+        self.population = GenomePopulation.from_genomes(self.genomes)
+
+    def test_round_trip(self):
+        restored = self.population.to_genomes()
+        self.assertEqual(len(restored), 8)
+        for original, genome in zip(self.genomes, restored):
+            self.assertEqual(original.as_soa(), genome.as_soa())
+
+    def test_categorical_codes(self):
+        self.genomes[0].genes['structural_system'].children[0].value = 'masonry'
+        population = GenomePopulation.from_genomes(self.genomes)
+        self.assertEqual(population.columns[('structural_system', 'material')].dtype, np.int8)
+        self.assertEqual(population.labels[('structural_system', 'material')][-1], 'masonry')
+        self.assertEqual(population.to_genomes()[0].genes['structural_system'].children[0].value, 'masonry')
+
+    def test_crossover_and_mutate(self):
+        parents1, parents2 = self.population.take([0, 1, 2, 3]), self.population.take([4, 5, 6, 7])
+        children = parents1.crossover(parents2).mutate(mutation_rate=1.0)
+        for i, child in enumerate(children.to_genomes()):
+            parents = (self.genomes[i], self.genomes[i + 4])
+            # Categorical genes pass through unchanged, numeric genes are scaled by at most 20%
+            mep = [c.value for c in child.genes['mep_systems'].children]
+            self.assertIn(mep, [[c.value for c in p.genes['mep_systems'].children] for p in parents])
+            ratios = [child.genes['facade'].children[0].value / p.genes['facade'].children[0].value for p in parents]
+            self.assertTrue(any(0.8 <= ratio <= 1.2 for ratio in ratios))
+
 class TestEvolutionaryAlgorithm(unittest.TestCase):
     def setUp(self):
         self.ea = EvolutionaryAlgorithm(population_size=10, generations=5)
@@ -38,6 +127,63 @@ class TestEvolutionaryAlgorithm(unittest.TestCase):
         self.assertEqual(len(self.ea.population), 10)
         self.assertEqual(self.ea.generations, 5)
 
+    def test_evaluate_fitness_caches_scores(self):
+        calls = []
+        self.ea.evaluate_population = lambda genomes: [calls.append(genome) or [len(calls)] * 7 for genome in genomes]
+        genome1, genome2 = BuildingGenome(), BuildingGenome()
+        self.ea.population = [genome1, genome2, genome1, genome2]
+        first = self.ea.evaluate_fitness()
+        second = self.ea.evaluate_fitness()
+        self.assertEqual(len(calls), 2)
+        self.assertTrue((first == second).all())
+        self.assertTrue((first[0] == first[2]).all())
+        self.assertEqual((self.ea.fitness_cache.hits, self.ea.fitness_cache.misses), (6, 2))
+
+    def test_select_parents(self):
+        fitness_scores = np.repeat(np.arange(10.0)[:, np.newaxis], 7, axis=1)
+        winners = self.ea.select_parents(fitness_scores, 20, tournament_size=200)
+        self.assertTrue((winners == 9).all())
+        # The expected winner of a 3-way tournament over 0..9 is about 6.6
+        winners = self.ea.select_parents(fitness_scores, 1000)
+        self.assertGreater(winners.mean(), 5.5)
+
+    def test_evolve_evaluates_each_generation_once(self):
+        evaluated = []
+        evaluate_fitness = self.ea.evaluate_fitness
+        self.ea.evaluate_population = lambda genomes: np.random.random((len(genomes), 7))
+        self.ea.evaluate_fitness = lambda known_scores=None: evaluated.append(list(self.ea.population)) or evaluate_fitness(known_scores)
+        best_genome, fitness_scores = self.ea.evolve()
+        self.assertEqual(len(evaluated), 5)
+        self.assertEqual(evaluated[-1], self.ea.population)
+        self.assertIs(best_genome, self.ea.population[np.argmax(fitness_scores.mean(axis=1))])
+        self.assertEqual(self.ea.all_fitness_scores.shape, (50, 7))
+        self.assertTrue((self.ea.all_fitness_scores[-10:] == fitness_scores).all())
+
+    def test_next_generation_keeps_elites(self):
+        fitness_scores = np.repeat(np.arange(10.0)[:, np.newaxis], 7, axis=1)
+        ea = EvolutionaryAlgorithm(population_size=10, elite_size=2)
+        parents = list(ea.population)
+        population, known_scores = ea.next_generation(fitness_scores)
+        self.assertEqual(len(population), 10)
+        self.assertEqual(population[:2], [parents[9], parents[8]])
+        self.assertEqual(sorted(known_scores), [0, 1])
+        self.assertTrue((known_scores[0] == fitness_scores[9]).all())
+
+        # Elites are not simulated again even when their cached scores have been evicted
+        ea.population = population
+        ea.evaluate_population = lambda genomes: np.zeros((len(genomes), 7))
+        scores = ea.evaluate_fitness(known_scores)
+        self.assertTrue((scores[0] == 9).all())
+
+    def test_seed_reproduces_run(self):
+        populations = []
+        for _ in range(2):
+            ea = EvolutionaryAlgorithm(population_size=8, generations=3, n_workers=1, seed=42)
+            ea.evaluate_population = lambda genomes: np.array([[g.genes['building_envelope'].children[0].value] * 7 for g in genomes])
+            ea.evolve()
+            populations.append(population_as_soa(ea.population))
+        self.assertTrue((populations[0] == populations[1]).all())
+
     def test_evolve(self):
         best_genome, _ = self.ea.evolve()
         self.assertIsInstance(best_genome, BuildingGenome)
@@ -54,10 +200,37 @@ class TestNSGAII(unittest.TestCase):
         self.assertIsInstance(fronts, list)
         self.assertTrue(all(isinstance(front, list) for front in fronts))
 
+    def test_evaluate_fitness_caches_scores(self):
+        calls = []
+        self.nsga_ii.evaluate_population = lambda genomes: [calls.append(genome) or list(range(7)) for genome in genomes]
+        self.nsga_ii.evaluate_fitness()
+        scores = self.nsga_ii.evaluate_fitness(self.nsga_ii.population[:5])
+        self.assertEqual(len(calls), 10)
+        # Columns come back in NSGA_OBJECTIVES order
+        self.assertEqual(scores[0].tolist(), [OBJECTIVES.index(objective) for objective in NSGA_OBJECTIVES])
+
+    def test_seed_reproduces_offspring(self):
+        offspring = [population_as_soa(NSGAII(population_size=8, seed=7).create_offspring()) for _ in range(2)]
+        self.assertTrue((offspring[0] == offspring[1]).all())
+
+    def test_sort_and_select_with_scores(self):
+        scores = np.array([[3.0, 3.0], [1.0, 1.0], [3.0, 1.0], [1.0, 3.0], [2.0, 2.0]])
+        fronts = self.nsga_ii.fast_non_dominated_sort(list(range(5)), scores)
+        self.assertEqual(fronts, [[0], [2, 3, 4], [1]])
+        distances = self.nsga_ii.calculate_crowding_distance(fronts, scores)
+        self.assertEqual(distances[0], float('inf'))
+        self.assertEqual(distances[4], 2.0)
+        self.nsga_ii.population_size = 3
+        self.assertEqual(sorted(self.nsga_ii.select_next_generation(fronts, distances)), [0, 2, 3])
+
     def test_calculate_crowding_distance(self):
-        front = self.nsga_ii.population[:5]
-        self.nsga_ii.calculate_crowding_distance([front])
-        self.assertTrue(all(hasattr(ind, 'crowding_distance') for ind in front))
+        front = [0, 1, 2, 3, 4]
+        scores = np.random.default_rng(0).random((5, 3))
+        distances = self.nsga_ii.calculate_crowding_distance([front], scores)
+        self.assertEqual(distances.shape, (5,))
+        self.assertTrue((distances >= 0).all())
+        self.assertTrue(np.isinf(distances[scores.argmin(axis=0)]).all())
+        self.assertTrue(np.isinf(distances[scores.argmax(axis=0)]).all())
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
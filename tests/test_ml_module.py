@@ -19,6 +19,14 @@ class TestMLModule(unittest.TestCase):
         predictions = self.surrogate_model.predict(test_genome)
         self.assertEqual(len(predictions), 7)
 
+    def test_predict_batch(self):
+        self.surrogate_model.train(self.genomes, self.fitness_scores)
+        test_genomes = [BuildingGenome() for _ in range(5)]
+        predictions = self.surrogate_model.predict_batch(test_genomes)
+        self.assertEqual(predictions.shape, (5, 7))
+        single = self.surrogate_model.predict(test_genomes[2])
+        np.testing.assert_allclose(list(single.values()), predictions[2])
+
     def test_feature_importance(self):
         self.surrogate_model.train(self.genomes, self.fitness_scores)
         importance = self.surrogate_model.feature_importance()
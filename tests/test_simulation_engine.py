@@ -1,7 +1,8 @@
 # "tests/test_simulation_engine.py"
 
 import unittest
-from src.genetic_algorithm.encoding import BuildingGenome
+import numpy as np
+from src.genetic_algorithm.encoding import BuildingGenome, HierarchicalGene, population_as_soa
 from src.simulation_engine.structural_integrity import StructuralIntegrity
 from src.simulation_engine.energy_simulation import EnergySimulation
 from src.simulation_engine.safety_assessment import SafetyAssessment
@@ -50,11 +51,72 @@ class TestSimulationEngine(unittest.TestCase):
         self.assertIn('evacuation_efficiency', result)
         self.assertTrue(0 <= result['evacuation_efficiency'] <= 1)
 
+    def test_pedestrian_seed_reproduces_run(self):
+        self.genome.genes['floor_plans'].children[0].value = 2
+        results = [PedestrianFlowSimulation(self.genome, seed=3).simulate() for _ in range(2)]
+        self.assertEqual(results[0], results[1])
+
+    def test_pedestrian_floors_step_as_batch(self):
+        pf = PedestrianFlowSimulation(self.genome)
+        positions, _ = pf.initialise_pedestrians(3)
+        velocities = np.random.randn(*positions.shape)
+        exits, obstacles = pf.generate_exits(3), pf.generate_obstacles(3)
+        forces = pf.calculate_forces(positions, velocities, exits, obstacles)
+        congestion = pf.calculate_congestion(positions)
+        for floor in range(3):
+            np.testing.assert_allclose(forces[floor], pf.calculate_forces(positions[floor], velocities[floor], exits[floor], obstacles[floor]))
+            self.assertAlmostEqual(congestion[floor], pf.calculate_congestion(positions[floor]))
+
+    def test_safety_is_deterministic(self):
+        first = SafetyAssessment(self.genome).assess()
+        self.assertEqual(first, SafetyAssessment(self.genome).assess())
+        self.assertTrue(0.7 <= first['hazardous_material_safety'] <= 1.0)
+        self.assertTrue(0.6 <= first['security_measures'] <= 1.0)
+
     def test_blast_resistance(self):
         br = BlastResistanceSimulation(self.genome)
         result = br.simulate()
         self.assertIn('blast_resistance_score', result)
         self.assertTrue(0 <= result['blast_resistance_score'] <= 1)
 
+    def test_blast_response_matches_integration(self):
+        from scipy.integrate import odeint
+
+        def dynamics(y, t, m, k, f0, td):
+            x, dx = y
+            f = f0 * (1 - t/td) if t <= td else 0
+            return [dx, (f - k * x) / m]
+
+        br = BlastResistanceSimulation(self.genome)
+        t = np.linspace(0, 0.5, 1000)
+        mass, stiffness, force = 1e6, 4e9, 1000 * br.width * br.length
+        sol = odeint(dynamics, [0, 0], t, args=(mass, stiffness, force, 0.02), rtol=1e-10, atol=1e-14, hmax=1e-4)
+        displacement, velocity = br.sdof_response(t, mass, stiffness, force, 0.02)
+        np.testing.assert_allclose(displacement, sol[:, 0], atol=1e-8 * np.abs(sol[:, 0]).max())
+        np.testing.assert_allclose(velocity, sol[:, 1], atol=1e-8 * np.abs(sol[:, 1]).max())
+
+    def test_cost_rejects_unpriced_material(self):
+        self.genome.genes.structural_system.children[0] = HierarchicalGene('material', 'granite')
+        with self.assertRaises(KeyError):
+            CostEstimation(self.genome).estimate()
+        with self.assertRaises(KeyError):
+            CostEstimation.estimate_batch(population_as_soa([self.genome]))
+
+    def test_batch_matches_single(self):
+        genomes = [BuildingGenome() for _ in range(20)]
+        records = population_as_soa(genomes)
+        np.testing.assert_allclose(EnergySimulation.simulate_batch(records),
+                                   [EnergySimulation(g).simulate()['energy_efficiency'] for g in genomes])
+        np.testing.assert_allclose(LivabilityEvaluation.evaluate_batch(records),
+                                   [LivabilityEvaluation(g).evaluate()['livability_score'] for g in genomes])
+        np.testing.assert_allclose(CostEstimation.estimate_batch(records),
+                                   [CostEstimation(g).estimate()['cost_score'] for g in genomes])
+        np.testing.assert_allclose(BlastResistanceSimulation.simulate_batch(records),
+                                   [BlastResistanceSimulation(g).simulate()['blast_resistance_score'] for g in genomes])
+        np.testing.assert_allclose(StructuralIntegrity.analyse_batch(records),
+                                   [StructuralIntegrity(g).analyse()['overall_integrity'] for g in genomes])
+        np.testing.assert_allclose(SafetyAssessment.assess_batch(records),
+                                   [SafetyAssessment(g).assess()['overall_safety'] for g in genomes])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file